@@ -0,0 +1,137 @@
+"""
+じゃんけんの対戦ループの速さを，1秒あたりの対戦数で比べるベンチマーク
+・Hand: 以前と同じく，毎回Hand(...)を作り，is_stronger_thanの剰余計算で勝敗を決めるループ
+・int: Mainと同じく，手を整数のまま扱ってOUTCOMEを引くループ
+・BatchEngine: Playerを通さずにまとめて対戦させる
+chap_10のディレクトリで python bench_games.py として実行する
+"""
+
+import random
+import time
+
+from strategy import (
+    OUTCOME,
+    BatchEngine,
+    Hand,
+    Player,
+    ProbStrategy,
+    Strategy,
+    WinningStrategy,
+)
+
+
+def stronger(a: Hand, b: Hand) -> bool:
+    # 比較用: 以前のHand.is_stronger_thanと同じ剰余計算
+    return a.value != b.value and (a.value + 1) % 3 == b.value
+
+
+class EnumProbStrategy(Strategy):
+    # 比較用: 以前のProbStrategyと同じく，手をHandで持ち，引くたびにHand(...)を2回作る
+    def __init__(self, rng: random.Random) -> None:
+        self.__rng = rng
+        self.__prev_hand = Hand(0)
+        self.__current_hand = Hand(0)
+        self.__history = [[1, 1, 1], [1, 1, 1], [1, 1, 1]]
+
+    # @override
+    def next_hand(self) -> Hand:
+        second_table = self.__history[self.__current_hand.value]
+        bet = self.__rng.randint(0, sum(second_table))
+        if bet < second_table[0]:
+            hand_value = 0
+        elif bet < second_table[0] + second_table[1]:
+            hand_value = 1
+        else:
+            hand_value = 2
+        self.__prev_hand = self.__current_hand
+        self.__current_hand = Hand(hand_value)
+        return Hand(hand_value)
+
+    # @override
+    def study(self, win: bool) -> None:
+        pval = self.__prev_hand.value
+        cval = self.__current_hand.value
+        if win:
+            self.__history[pval][cval] += 1
+        else:
+            self.__history[pval][(cval + 1) % 3] += 2
+
+
+class EnumWinningStrategy(Strategy):
+    # 比較用: 以前のWinningStrategyと同じく，Hand(...)で手を作る
+    def __init__(self, rng: random.Random) -> None:
+        self.__rng = rng
+        self.won = False
+        self.prev_hand = None
+
+    # @override
+    def next_hand(self) -> Hand:
+        if not self.won:
+            self.prev_hand = Hand(self.__rng.randrange(3))
+        return self.prev_hand
+
+    # @override
+    def study(self, win: bool) -> None:
+        self.won = win
+
+
+def hand_loop(games: int, seed: int) -> int:
+    player1 = Player("Taro", EnumWinningStrategy(random.Random(seed)))
+    player2 = Player("Hana", EnumProbStrategy(random.Random(seed + 1)))
+    wins = 0
+    for _ in range(games):
+        hand1 = player1.next_hand()
+        hand2 = player2.next_hand()
+        if stronger(hand1, hand2):
+            wins += 1
+            player1.win()
+            player2.lose()
+        elif stronger(hand2, hand1):
+            player1.lose()
+            player2.win()
+        else:
+            player1.even()
+            player2.even()
+    return wins
+
+
+def int_loop(games: int, seed: int) -> int:
+    player1 = Player("Taro", WinningStrategy(random.Random(seed)))
+    player2 = Player("Hana", ProbStrategy(random.Random(seed + 1)))
+    wins = 0
+    for _ in range(games):
+        result = OUTCOME[player1.next_value()][player2.next_value()]
+        if result > 0:
+            wins += 1
+            player1.win()
+            player2.lose()
+        elif result < 0:
+            player1.lose()
+            player2.win()
+        else:
+            player1.even()
+            player2.even()
+    return wins
+
+
+def batch(games: int, seed: int) -> int:
+    engine = BatchEngine(
+        WinningStrategy(random.Random(seed)), ProbStrategy(random.Random(seed + 1))
+    )
+    return engine.run(games).get_wins1()
+
+
+def main(games: int = 500000, seed: int = 3) -> None:
+    for label, loop in (("Hand", hand_loop), ("int", int_loop), ("BatchEngine", batch)):
+        start = time.perf_counter()
+        wins = loop(games, seed)
+        elapsed = time.perf_counter() - start
+        print(
+            "{:<12} {:>10,.0f} games/s  (Taro won {:,} of {:,})".format(
+                label, games / elapsed, wins, games
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -5,9 +5,30 @@ Strategyパターン
 ・三すくみの勝ち負けの計算は，「1ずらして3の余りをとる」がカギ
 """
 
+from concurrent.futures import Executor, ProcessPoolExecutor
 from enum import Enum
+from operator import add
 from abc import ABC, abstractmethod
+from array import array
+from bisect import bisect_right
 import random
+import time
+from typing import Callable, List, Optional, Sequence, Tuple, Type
+
+
+def make_outcome(n: int) -> Tuple[Tuple[int, ...], ...]:
+    # n種類(奇数)の手の三すくみの一般化．手aは，a+1からa+(n-1)/2までの手(を nで割った余り)に勝つ
+    # 返り値[a][b]は，手aで手bと戦ったときのaから見た結果(勝ち1，負け-1，あいこ0)
+    assert n % 2 == 1
+    half = n // 2
+    return tuple(
+        tuple(0 if a == b else 1 if (b - a) % n <= half else -1 for b in range(n))
+        for a in range(n)
+    )
+
+
+# じゃんけんの結果の表．OUTCOME[a][b]は，手aで手bと戦ったときのaから見た結果
+OUTCOME = make_outcome(3)
 
 
 class Hand(Enum):
@@ -23,12 +44,11 @@ class Hand(Enum):
         return self.__fight(h) == -1
 
     def __fight(self, h: "Hand") -> int:
-        if self.value == h.value:
-            return 0
-        elif (self.value + 1) % 3 == h.value:
-            return 1
-        else:
-            return -1
+        return OUTCOME[self.value][h.value]
+
+
+# Hand(value)の検索は遅いので，値から手を引くときはこの表を使う
+_HANDS = tuple(Hand)
 
 
 class Player:
@@ -43,6 +63,9 @@ class Player:
     def next_hand(self):
         return self.__strategy.next_hand()
 
+    def next_value(self) -> int:  # 手を0,1,2の整数で返す版
+        return self.__strategy.next_value()
+
     def win(self):
         self.__strategy.study(True)
         self.__wincount += 1
@@ -56,6 +79,13 @@ class Player:
     def even(self):
         self.__gamecount += 1
 
+    def add_results(self, wins: int, loses: int, evens: int):
+        # BatchEngineでまとめて行った対戦の結果を，勝敗数に足し込む
+        # (studyはBatchEngineが対戦ごとに済ませているので，ここでは数だけ足す)
+        self.__wincount += wins
+        self.__losecount += loses
+        self.__gamecount += wins + loses + evens
+
     def to_string(self):
         return "[{}:{}games, {}win, {}lose]".format(
             self.__name, self.__gamecount, self.__wincount, self.__losecount
@@ -71,76 +101,486 @@ class Strategy(ABC):
     def study(self, win: bool) -> None:
         pass
 
+    # BatchEngineが使う，手を0,1,2の整数で扱う版．既定ではnext_hand/studyを呼ぶだけ
+    def next_value(self) -> int:
+        return self.next_hand().value
+
+    def study_value(self, outcome: int) -> None:
+        # outcomeは自分から見た勝ち1，負け-1，あいこ0．あいこのときはstudyしない(Mainと同じ)
+        if outcome:
+            self.study(outcome > 0)
+
 
 class ProbStrategy(Strategy):
-    def __init__(self) -> None:
-        self.__prev_hand: Hand = Hand(0)
-        self.__current_hand: Hand = Hand(0)
-        # fmt:off
-        self.__history = [[1, 1, 1, ], [1, 1, 1, ], [1, 1, 1, ], ]
-        # fmt:on
+    def __init__(self, rng: Optional[random.Random] = None, hands: int = 3) -> None:
+        # rngを渡すと乱数をそこから取る(種を決めて再現したいとき)．省くとrandomモジュールを使う
+        # handsで手の種類の数を変えられる(next_handでHandを返せるのは3のときだけ)
+        assert hands >= 2
+        self.__rng = random if rng is None else rng
+        self.__hands = hands
+        # 手は中では整数(Hand.value)で持ち，Handにするのはnext_handで返すときだけ
+        self.__prev_value = 0
+        self.__current_value = 0
+        # 前の手がpのときの次の手の重みhistory[p][j]を，累積和の形で持つ
+        # __cumulative[p][j] = history[p][0] + ... + history[p][j]．最初は重みがすべて1
+        self.__cumulative = [list(range(1, hands + 1)) for _ in range(hands)]
+        # next_handsでまとめて引いておいた手(前の手ごと)．その行の重みが変わったら捨てる
+        self.__buffers: List[List[int]] = [[] for _ in range(hands)]
 
     # @override
     def next_hand(self) -> Hand:
-        second_table = self.__history[self.__current_hand.value]
-        bet = random.randint(0, sum(second_table))
-        if bet < second_table[0]:
-            hand_value = 0
-        elif bet < second_table[0] + second_table[1]:
-            hand_value = 1
+        self.__check_hand()
+        return _HANDS[self.next_value()]
+
+    # @override
+    def next_value(self) -> int:
+        # 重みに比例した確率で次の手を引く．累積和を二分探索するので，手の種類がnでもO(log n)
+        buffer = self.__buffers[self.__current_value]
+        if buffer:
+            hand_value = buffer.pop()
         else:
-            hand_value = 2
-        self.__prev_hand = self.__current_hand
-        self.__current_hand = Hand(hand_value)
-        return Hand(hand_value)
+            cumulative = self.__cumulative[self.__current_value]
+            bet = self.__rng.randrange(cumulative[-1])
+            hand_value = bisect_right(cumulative, bet)
+        self.__prev_value = self.__current_value
+        self.__current_value = hand_value
+        return hand_value
+
+    def next_hands(self, n: int) -> List[Hand]:
+        self.__check_hand()
+        return [_HANDS[v] for v in self.next_values(n)]
+
+    def next_values(self, n: int) -> List[int]:
+        # studyを挟まずにn回続けてnext_valueしたのと同じ分布の手をn個返す
+        # 前の手ごとにrandom.choicesでまとめて引いておき，それを順に使う
+        # (studyで重みが変わった行の引き置きは捨てるので，引き置きが古い重みで使われることはない)
+        choices = self.__rng.choices
+        population = range(self.__hands)
+        buffers = self.__buffers
+        cumulative = self.__cumulative
+        current = self.__current_value
+        prev = self.__prev_value
+        result = []
+        for i in range(n):
+            buffer = buffers[current]
+            if not buffer:
+                k = min(max(n - i, 16), 4096)
+                buffer.extend(choices(population, cum_weights=cumulative[current], k=k))
+            prev = current
+            current = buffer.pop()
+            result.append(current)
+        self.__prev_value = prev
+        self.__current_value = current
+        return result
 
     # @override
     def study(self, win: bool) -> None:
-        pval = self.__prev_hand.value
-        cval = self.__current_hand.value
-        if win:
-            self.__history[pval][cval] += 1
+        self.study_value(1 if win else -1)
+
+    # @override
+    def study_value(self, outcome: int) -> None:
+        if not outcome:
+            return
+        pval = self.__prev_value
+        cval = self.__current_value
+        cumulative = self.__cumulative[pval]
+        self.__buffers[pval].clear()
+        # 累積和の更新は，1要素ずつのループではなくスライスとmapでまとめて行う
+        if outcome > 0:
+            # 勝ったら今の手の重みを1増やす．累積和ではcval以降が1ずつ増える
+            cumulative[cval:] = map((1).__add__, cumulative[cval:])
         else:
-            self.__history[pval][(cval + 1) % 3] += 1
-            self.__history[pval][(cval + 1) % 3] += 1
+            # 負けたら今の手以外の重みを1ずつ増やす．累積和のj番目は，j以下の今の手以外の数だけ増える
+            cumulative[:cval] = map(add, cumulative[:cval], range(1, cval + 1))
+            cumulative[cval:] = map(add, cumulative[cval:], range(cval, self.__hands))
+
+    def __check_hand(self) -> None:
+        # Handにできるのは3種類のときだけ．ほかの数ではnext_value(s)で整数のまま使う
+        if self.__hands != len(_HANDS):
+            raise ValueError(
+                "hands={} cannot be returned as Hand; use next_value(s)".format(
+                    self.__hands
+                )
+            )
 
 
 class WinningStrategy(Strategy):
-    def __init__(self) -> None:
+    def __init__(self, rng: Optional[random.Random] = None) -> None:
+        self.__rng = random if rng is None else rng
         self.won: bool = False
-        self.prev_hand: Hand = None
+        self.__prev_value: Optional[int] = None
+
+    @property
+    def prev_hand(self) -> Optional[Hand]:
+        # 中では整数で持っているので，外から見るときだけHandにする
+        if self.__prev_value is None:
+            return None
+        return _HANDS[self.__prev_value]
+
+    @prev_hand.setter
+    def prev_hand(self, hand: Optional[Hand]) -> None:
+        self.__prev_value = None if hand is None else hand.value
 
     # @override
     # 今のロジックなら，self.won = Falseで初期化されていれば，Noneが返されることはない. 一応assertする
     def next_hand(self) -> Hand:
+        return _HANDS[self.next_value()]
+
+    # @override
+    def next_value(self) -> int:
         if not self.won:
-            self.prev_hand = Hand(random.randrange(3))
-        assert isinstance(self.prev_hand, Hand)
-        return self.prev_hand
+            self.__prev_value = self.__rng.randrange(3)
+        assert self.__prev_value is not None
+        return self.__prev_value
 
     # @override
 
     def study(self, win: bool) -> None:
         self.won = win
 
+    # @override
+    def study_value(self, outcome: int) -> None:
+        if outcome:
+            self.won = outcome > 0
+
+
+class BatchResult:
+    def __init__(
+        self,
+        wins1: int,
+        wins2: int,
+        evens: int,
+        hands1: Optional[array],
+        hands2: Optional[array],
+    ) -> None:
+        self.__wins1 = wins1
+        self.__wins2 = wins2
+        self.__evens = evens
+        self.__hands1 = hands1
+        self.__hands2 = hands2
+
+    def get_games(self) -> int:
+        return self.__wins1 + self.__wins2 + self.__evens
+
+    def get_wins1(self) -> int:
+        return self.__wins1
+
+    def get_wins2(self) -> int:
+        return self.__wins2
+
+    def get_evens(self) -> int:
+        return self.__evens
+
+    # record=Trueで実行したときだけ，各対戦の手(0,1,2)の列が入る
+    def get_hands1(self) -> Optional[array]:
+        return self.__hands1
+
+    def get_hands2(self) -> Optional[array]:
+        return self.__hands2
+
+
+class BatchEngine:
+    # 2つのStrategyを，Handや表示を通さずに整数の手でまとめて対戦させる
+    # 勝敗はOUTCOMEを引くだけで決め，対戦ごとの出力はしない
+    # 各Strategyは前の対戦の結果を見て次の手を決めるので，対戦を配列でまとめて計算することはできず，
+    # 1対戦ずつ進める．ただしその中身はint同士の演算と表引きだけにしてある
+    # 同じ乱数の種のStrategyを渡せば，Mainと同じ1対戦ずつのループと全く同じ結果になる
+    def __init__(
+        self,
+        strategy1: Strategy,
+        strategy2: Strategy,
+        outcome: Tuple[Tuple[int, ...], ...] = OUTCOME,
+    ) -> None:
+        # 手の種類を変えるときは，outcomeにmake_outcome(n)を渡す
+        self.__strategy1 = strategy1
+        self.__strategy2 = strategy2
+        self.__outcome = outcome
+
+    def run(
+        self,
+        games: int,
+        record: bool = False,
+        observer: Optional[Callable[[int], None]] = None,
+    ) -> BatchResult:
+        # observerを渡すと，対戦ごとにstrategy1から見た結果(1,-1,0)で呼ぶ(StatsCollector.recordなど)
+        next1 = self.__strategy1.next_value
+        next2 = self.__strategy2.next_value
+        study1 = self.__strategy1.study_value
+        study2 = self.__strategy2.study_value
+        outcome = self.__outcome
+        hands1 = array("b") if record else None
+        hands2 = array("b") if record else None
+        wins1 = wins2 = 0
+        for _ in range(games):
+            h1 = next1()
+            h2 = next2()
+            if record:
+                hands1.append(h1)
+                hands2.append(h2)
+            r = outcome[h1][h2]
+            if observer is not None:
+                observer(r)
+            if r > 0:
+                wins1 += 1
+                study1(1)
+                study2(-1)
+            elif r < 0:
+                wins2 += 1
+                study1(-1)
+                study2(1)
+        return BatchResult(wins1, wins2, games - wins1 - wins2, hands1, hands2)
+
+
+class StatsSnapshot:
+    # StatsCollectorのある時点の集計．rolling_rateは直近window対戦の勝率
+    def __init__(
+        self,
+        names: List[str],
+        games: int,
+        wins: List[int],
+        loses: List[int],
+        rolling_rates: List[float],
+        window: int,
+    ) -> None:
+        self.__names = names
+        self.__games = games
+        self.__wins = wins
+        self.__loses = loses
+        self.__rolling_rates = rolling_rates
+        self.__window = window
+
+    def get_games(self) -> int:
+        return self.__games
+
+    def get_wins(self, i: int) -> int:
+        return self.__wins[i]
+
+    def get_loses(self, i: int) -> int:
+        return self.__loses[i]
+
+    def get_rolling_rate(self, i: int) -> float:
+        return self.__rolling_rates[i]
+
+    def to_string(self) -> str:
+        return " ".join(
+            "[{}:{}games, {}win, {}lose, last{}:{:.3f}]".format(
+                name, self.__games, w, lo, self.__window, rate
+            )
+            for name, w, lo, rate in zip(
+                self.__names, self.__wins, self.__loses, self.__rolling_rates
+            )
+        )
+
+
+def _print_snapshot(snapshot: StatsSnapshot) -> None:
+    print(snapshot.to_string())
+
+
+class StatsCollector:
+    # 2人の対戦の勝敗を，1対戦ごとに表示する代わりにまとめて数える
+    # ・勝敗数は長さ2の配列で，直近window対戦の結果は長さwindowの輪っか状の配列で持つので，
+    #   何対戦しても使うメモリは変わらない
+    # ・every対戦ごと，またはinterval秒ごとに，その時点の集計(StatsSnapshot)をsinkへ渡す
+    #   (sinkを省くと1行で表示する)
+    # ・verbose=Trueなら，Mainと同じく1対戦ごとに"Winner:..."か"Even..."を表示する(デバッグ用)
+    def __init__(
+        self,
+        names: Sequence[str],
+        window: int = 1000,
+        every: int = 0,
+        interval: Optional[float] = None,
+        sink: Optional[Callable[[StatsSnapshot], None]] = None,
+        verbose: bool = False,
+    ) -> None:
+        assert len(names) == 2 and window > 0 and every >= 0
+        self.__names = list(names)
+        self.__window = window
+        self.__every = every
+        self.__interval = interval
+        self.__sink = _print_snapshot if sink is None else sink
+        self.__verbose = verbose
+        self.__games = 0
+        self.__wins = array("q", [0, 0])
+        self.__loses = array("q", [0, 0])
+        # __recent[games % window]にplayer1から見た結果を入れる．__recent_winsはその中の各自の勝ち数
+        self.__recent = array("b", bytes(window))
+        self.__recent_wins = array("q", [0, 0])
+        self.__next_time = None if interval is None else time.monotonic() + interval
+
+    def record(self, outcome: int) -> None:
+        # 1対戦の結果をplayer1から見た値(勝ち1，負け-1，あいこ0)で記録する
+        if outcome > 0:
+            winner = 0
+        elif outcome < 0:
+            winner = 1
+        else:
+            winner = -1
+        if self.__verbose:
+            if winner < 0:
+                print("Even...")
+            else:
+                print("Winner:{}".format(self.to_string(winner)))
+        if winner >= 0:
+            self.__wins[winner] += 1
+            self.__loses[1 - winner] += 1
+        # 輪っかの中で一番古い結果を捨てて，新しい結果を入れる
+        slot = self.__games % self.__window
+        old = self.__recent[slot]
+        if old:
+            self.__recent_wins[0 if old > 0 else 1] -= 1
+        self.__recent[slot] = outcome
+        if winner >= 0:
+            self.__recent_wins[winner] += 1
+        self.__games += 1
+        if self.__every and self.__games % self.__every == 0:
+            self.emit()
+        elif self.__next_time is not None and time.monotonic() >= self.__next_time:
+            self.emit()
+
+    def snapshot(self) -> StatsSnapshot:
+        recent = min(self.__games, self.__window)
+        rates = [w / recent if recent else 0.0 for w in self.__recent_wins]
+        return StatsSnapshot(
+            self.__names,
+            self.__games,
+            list(self.__wins),
+            list(self.__loses),
+            rates,
+            self.__window,
+        )
+
+    def emit(self) -> None:
+        # 今の集計をsinkへ渡す．タイマーはここから数え直す
+        self.__sink(self.snapshot())
+        if self.__interval is not None:
+            self.__next_time = time.monotonic() + self.__interval
+
+    def to_string(self, i: int) -> str:
+        # i番目のプレイヤーの今の勝敗を，Player.to_stringと同じ形で返す
+        return "[{}:{}games, {}win, {}lose]".format(
+            self.__names[i], self.__games, self.__wins[i], self.__loses[i]
+        )
+
+
+def match_seed(seed: int, i: int, j: int) -> int:
+    # トーナメントの種seedとi番目・j番目の組から決まる試合ごとの種
+    # ワーカーの数や試合の終わる順番によらず同じ値になる
+    return random.Random("{}:{}:{}".format(seed, i, j)).getrandbits(64)
+
+
+def _play_match(
+    factory1: Callable[[random.Random], Strategy],
+    factory2: Callable[[random.Random], Strategy],
+    games: int,
+    seed: int,
+) -> Tuple[int, int, int]:
+    # プロセスプールに渡せるよう，モジュールのトップレベルに置く
+    # 試合の種から2つのStrategyそれぞれの乱数を作り，BatchEngineでgames回戦わせる
+    rng = random.Random(seed)
+    strategy1 = factory1(random.Random(rng.getrandbits(64)))
+    strategy2 = factory2(random.Random(rng.getrandbits(64)))
+    result = BatchEngine(strategy1, strategy2).run(games)
+    return result.get_wins1(), result.get_wins2(), result.get_evens()
+
+
+class TournamentResult:
+    def __init__(
+        self, names: List[str], wins: List[List[int]], evens: List[List[int]]
+    ) -> None:
+        # wins[i][j]はiがjに勝った数，evens[i][j]はiとjのあいこの数
+        self.__names = names
+        self.__wins = wins
+        self.__evens = evens
+
+    def get_names(self) -> List[str]:
+        return self.__names
+
+    def get_wins(self, i: int, j: int) -> int:
+        return self.__wins[i][j]
+
+    def get_loses(self, i: int, j: int) -> int:
+        return self.__wins[j][i]
+
+    def get_evens(self, i: int, j: int) -> int:
+        return self.__evens[i][j]
+
+    def to_string(self, i: int) -> str:
+        # i番目の全試合の合計を，Player.to_stringと同じ形で返す
+        wins = sum(self.__wins[i])
+        loses = sum(row[i] for row in self.__wins)
+        games = wins + loses + sum(self.__evens[i])
+        return "[{}:{}games, {}win, {}lose]".format(self.__names[i], games, wins, loses)
+
+
+class Tournament:
+    # 総当たり戦．rosterの各組をgames回ずつ，プール上で並列に戦わせて勝敗表にまとめる
+    # ・rosterは(名前, rngを受け取ってStrategyを作る関数)の列．ProbStrategyなどのクラスはそのまま使える
+    # ・ProcessPoolExecutorでは作る関数をpickleで渡すので，lambdaではなくトップレベルの関数かクラスにする
+    # ・各試合の乱数はmatch_seedで決まるので，ワーカーの数によらず同じ結果になる
+    def __init__(
+        self,
+        roster: Sequence[Tuple[str, Callable[[random.Random], Strategy]]],
+        max_workers: Optional[int] = None,
+        executor_class: Type[Executor] = ProcessPoolExecutor,
+    ) -> None:
+        assert len(roster) >= 2
+        self.__roster = list(roster)
+        self.__max_workers = max_workers
+        self.__executor_class = executor_class
+
+    def run(self, games: int, seed: int = 0) -> TournamentResult:
+        n = len(self.__roster)
+        factories = [factory for _, factory in self.__roster]
+        wins = [[0] * n for _ in range(n)]
+        evens = [[0] * n for _ in range(n)]
+        with self.__executor_class(max_workers=self.__max_workers) as pool:
+            futures = [
+                (
+                    i,
+                    j,
+                    pool.submit(
+                        _play_match,
+                        factories[i],
+                        factories[j],
+                        games,
+                        match_seed(seed, i, j),
+                    ),
+                )
+                for i in range(n)
+                for j in range(i + 1, n)
+            ]
+            for i, j, future in futures:
+                wins[i][j], wins[j][i], evens[i][j] = future.result()
+                evens[j][i] = evens[i][j]
+        return TournamentResult([name for name, _ in self.__roster], wins, evens)
+
 
 class Main:
-    def __init__(self) -> None:  # Javaのmain関数を模して，これをmainとする
+    # Javaのmain関数を模して，これをmainとする
+    # verbose=Falseにすると1対戦ごとの表示をやめ，every対戦ごと(またはinterval秒ごと)に集計だけを表示する
+    def __init__(
+        self,
+        games: int = 10000,
+        verbose: bool = True,
+        every: int = 0,
+        interval: Optional[float] = None,
+    ) -> None:
         player1: Player = Player("Taro", WinningStrategy())
         player2: Player = Player("Hana", ProbStrategy())
-        for _ in range(10000):
-            next_hand1 = player1.next_hand()
-            next_hand2 = player2.next_hand()
-            if next_hand1.is_stronger_than(next_hand2):
-                print("Winner:{}".format(player1.to_string()))
+        stats = StatsCollector(
+            ["Taro", "Hana"], every=every, interval=interval, verbose=verbose
+        )
+        # 手は整数のまま扱い，勝敗はOUTCOMEを引いて決める(Handは作らない)
+        for _ in range(games):
+            result = OUTCOME[player1.next_value()][player2.next_value()]
+            stats.record(result)
+            if result > 0:
                 player1.win()
                 player2.lose()
-            elif next_hand2.is_stronger_than(next_hand1):
-                print("Winner:{}".format(player2.to_string()))
+            elif result < 0:
                 player1.lose()
                 player2.win()
             else:
-                print("Even...")
                 player1.even()
                 player2.even()
         print("Total result:")
@@ -148,4 +588,5 @@ class Main:
         print(player2.to_string())
 
 
-Main()
+if __name__ == "__main__":
+    Main()
@@ -0,0 +1,111 @@
+"""
+strategy.pyの確認用のテスト(python -m unittest で実行する)
+"""
+
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import accumulate
+import random
+import unittest
+
+from strategy import Hand, ProbStrategy, Tournament, WinningStrategy
+
+
+def cumulative(strategy: ProbStrategy):
+    return strategy._ProbStrategy__cumulative
+
+
+def buffers(strategy: ProbStrategy):
+    return strategy._ProbStrategy__buffers
+
+
+class ProbStrategyTest(unittest.TestCase):
+    def check_against_history(self, hands: int, steps: int = 2000) -> None:
+        # 前の手pのときの次の手jの重みhistory[p][j]を素直に数え，累積和の行と比べる
+        rng = random.Random(hands)
+        strategy = ProbStrategy(random.Random(hands), hands)
+        history = [[1] * hands for _ in range(hands)]
+        current = 0
+        for _ in range(steps):
+            prev = current
+            current = strategy.next_value()
+            outcome = rng.choice((1, -1, 0))
+            strategy.study_value(outcome)
+            if outcome > 0:
+                history[prev][current] += 1
+            elif outcome < 0:
+                for j in range(hands):
+                    if j != current:
+                        history[prev][j] += 1
+            expected = [list(accumulate(row)) for row in history]
+            self.assertEqual(cumulative(strategy), expected)
+
+    def test_cumulative_matches_history_3(self):
+        self.check_against_history(3)
+
+    def test_cumulative_matches_history_5(self):
+        self.check_against_history(5)
+
+    def test_study_discards_buffer_of_changed_row(self):
+        for hands in (3, 5):
+            for win in (True, False):
+                strategy = ProbStrategy(random.Random(1), hands)
+                # 前の手ごとに引き置きを作ってから，最後の組(prev, current)でstudyする
+                strategy.next_values(200)
+                prev = strategy._ProbStrategy__prev_value
+                before = [list(buffer) for buffer in buffers(strategy)]
+                self.assertTrue(before[prev])
+                strategy.study(win)
+                after = buffers(strategy)
+                self.assertEqual(after[prev], [])
+                for p in range(hands):
+                    if p != prev:
+                        self.assertEqual(after[p], before[p])
+
+    def test_next_hands(self):
+        strategy = ProbStrategy(random.Random(0))
+        hands = strategy.next_hands(50)
+        self.assertEqual(len(hands), 50)
+        self.assertTrue(all(isinstance(h, Hand) for h in hands))
+
+    def test_next_hands_rejects_other_hand_counts(self):
+        strategy = ProbStrategy(random.Random(0), hands=5)
+        with self.assertRaises(ValueError):
+            strategy.next_hands(10)
+        with self.assertRaises(ValueError):
+            strategy.next_hand()
+        # 整数の手ならそのまま使える
+        self.assertEqual(len(strategy.next_values(10)), 10)
+
+
+class TournamentTest(unittest.TestCase):
+    # プロセスプールに渡せるよう，rosterにはクラスをそのまま入れる
+    ROSTER = [
+        ("prob1", ProbStrategy),
+        ("winning", WinningStrategy),
+        ("prob2", ProbStrategy),
+        ("prob3", ProbStrategy),
+    ]
+
+    def table(self, result):
+        n = len(result.get_names())
+        return [
+            [(result.get_wins(i, j), result.get_evens(i, j)) for j in range(n)]
+            for i in range(n)
+        ]
+
+    def test_same_table_for_any_executor(self):
+        tables = []
+        for executor_class in (ThreadPoolExecutor, ProcessPoolExecutor):
+            for workers in (1, 2):
+                with self.subTest(executor=executor_class.__name__, workers=workers):
+                    tournament = Tournament(self.ROSTER, workers, executor_class)
+                    tables.append(self.table(tournament.run(2000, seed=7)))
+        for table in tables[1:]:
+            self.assertEqual(table, tables[0])
+        # 種が違えば表も変わる(種が試合に効いていることの確認)
+        other = Tournament(self.ROSTER, 2, ThreadPoolExecutor).run(2000, seed=8)
+        self.assertNotEqual(self.table(other), tables[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -9,12 +9,35 @@ Compositeパターン
 ・Entryクラスは抽象基底クラスに見えて，実装を含むためmixinであるともいえる
 """
 
+import os
+import sys
 from abc import ABC
 from abc import abstractmethod
-from typing import List
+from array import array
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from fnmatch import fnmatchcase
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+
+try:  # NumPyがあればTreeStoreの集計をベクトル化する(なくても動く)
+    import numpy as np
+except ImportError:
+    np = None
 
 
 class Entry(ABC):
+    # __slots__で__dict__を持たないようにし，1ノードあたりのメモリを抑える
+    __slots__ = ("_parent",)
+
+    def __init__(self) -> None:
+        # 親ディレクトリへの逆参照．サイズの変化を祖先に伝えるために使う
+        self._parent: Optional["Directory"] = None
+
+    @property
+    def parent(self) -> Optional["Directory"]:
+        return self._parent
+
     # 継承先クラスでインスタンス変数の定義を強制
     @property
     @abstractmethod
@@ -30,6 +53,38 @@ class Entry(ABC):
     def print_list(self, prefix: str = ""):
         pass
 
+    def __iter__(self) -> Iterator["Entry"]:  # Fileは子を持たない
+        return iter(())
+
+    def iter_paths(self, prefix: str = "") -> Iterator[Tuple[str, int]]:
+        # (パス, サイズ)を1つずつ返すジェネレータ
+        # 親のパスは段ごとに1つだけスタックに持ち，子のパスはそこから作る
+        bases = [prefix]
+        for e, depth in walk(self, PRE_ORDER):
+            path = bases[depth] + "/" + e.name
+            yield path, e.size
+            if depth + 1 < len(bases):  # 深い段の古いパスは上書きして使い回す
+                bases[depth + 1] = path
+            else:
+                bases.append(path)
+
+    def iter_lines(self, prefix: str = "") -> Iterator[str]:  # print_listの各行
+        return ("{} ({})".format(path, size) for path, size in self.iter_paths(prefix))
+
+    def write_list(
+        self, stream: Optional[TextIO] = None, prefix: str = "", chunk_lines: int = 4096
+    ) -> None:
+        # 1行ずつprintせず，chunk_lines行ずつまとめてstreamに書き出す
+        if stream is None:
+            stream = sys.stdout
+        lines = self.iter_lines(prefix)
+        while True:
+            chunk = list(islice(lines, chunk_lines))
+            if not chunk:
+                break
+            chunk.append("")
+            stream.write("\n".join(chunk))
+
     # str型との演算を定義
     def __add__(self, s: str):  # self + s の演算結果を定義 (実行されることはないが，気分でこちらも実装)
         assert isinstance(s, str)
@@ -43,7 +98,10 @@ class Entry(ABC):
 
 
 class File(Entry):
+    __slots__ = ("__name", "__size")
+
     def __init__(self, name: str, size: int) -> None:
+        super().__init__()
         self.__name = name
         self.__size = size
 
@@ -58,11 +116,37 @@ class File(Entry):
     def print_list(self, prefix: str = ""):
         print(prefix + "/" + self)
 
+    def resize(self, size: int):  # サイズを変更し，差分だけを祖先のDirectoryに伝える
+        delta = size - self.__size
+        self.__size = size
+        if self._parent is not None:
+            self._parent._propagate_size(delta)
+        return self
+
 
 class Directory(Entry):
+    __slots__ = (
+        "__name",
+        "__directory",
+        "__size",
+        "__pending",
+        "__children",
+        "__index",
+    )
+
     def __init__(self, name: str) -> None:
+        super().__init__()
         self.__name = name
         self.__directory: List[Entry] = []
+        # 配下の合計サイズを保持しておき，add/remove/resizeのたびに差分で更新する
+        # こうするとsizeの読み出しはO(1)になり，print_list全体も線形時間で済む
+        self.__size = 0
+        # 配下(自分を含む)のまだ読んでいないLazyDirectoryの数．__sizeと同じく差分で更新する
+        # 0でなければ__sizeはまだ確定していない
+        self.__pending = 0
+        # 名前→子のdictと木全体の索引．メモリを食うのでenable_indexを呼んだときだけ作る
+        self.__children: Optional[Dict[str, Entry]] = None
+        self.__index: Optional[NameIndex] = None
 
     @property
     def name(self) -> str:
@@ -70,17 +154,601 @@ class Directory(Entry):
 
     @property
     def size(self) -> int:
-        return sum(e.size for e in self.__directory)
+        if self.__pending:  # 配下の読んでいないLazyDirectoryを読んでから返す
+            self.load_all()
+        return self.__size
 
     def print_list(self, prefix: str = ""):  # Directory以下のEntryについて再帰的に表示
-        print(prefix + "/" + self)
-        for e in self.__directory:
-            e.print_list(prefix + "/" + self.name)
+        self.write_list(prefix=prefix)
 
     def add(self, entry: Entry):
-        self.__directory += [entry]
+        self.__check_addable(entry)
+        self.__directory.append(entry)
+        entry._parent = self
+        self._propagate_size(self.__accounted(entry), self.__pending_of(entry))
+        if self.__index is not None:
+            self.__attach(entry)
+        return self
+
+    # まとめて追加し，祖先への伝播は1回だけにする
+    def add_many(self, entries: Iterable[Entry]):
+        entries = list(entries)
+        if len(set(map(id, entries))) != len(entries):
+            raise ValueError("the same entry appears more than once")
+        for entry in entries:
+            self.__check_addable(entry)
+        delta = 0
+        pending = 0
+        for entry in entries:
+            entry._parent = self
+            delta += self.__accounted(entry)
+            pending += self.__pending_of(entry)
+        self.__directory.extend(entries)
+        self._propagate_size(delta, pending)
+        if self.__index is not None:
+            for entry in entries:
+                self.__attach(entry)
+        return self
+
+    def remove(self, entry: Entry):
+        self.__directory.remove(entry)
+        entry._parent = None
+        self._propagate_size(-self.__accounted(entry), -self.__pending_of(entry))
+        if self.__index is not None:
+            self.__detach(entry)
+        return self
+
+    def __check_addable(self, entry: Entry) -> None:
+        # 1つのEntryが複数のDirectoryに属すると合計がずれる
+        # また自分や自分の祖先を子にすると親の連鎖が輪になり，_propagate_sizeが止まらなくなる
+        # (assertは-Oで消えるので，例外で止める)
+        if entry.parent is not None:
+            raise ValueError(
+                "{} already belongs to {}".format(entry.name, entry.parent.name)
+            )
+        d: Optional[Directory] = self
+        while d is not None:
+            if d is entry:
+                raise ValueError("cannot add {} under itself".format(entry.name))
+            d = d._parent
+
+    @staticmethod
+    def __accounted(entry: Entry) -> int:
+        # 祖先の合計に今入っている分のサイズ．LazyDirectoryのsizeと違って読み込みを起こさない
+        return entry.__size if isinstance(entry, Directory) else entry.size
+
+    @staticmethod
+    def __pending_of(entry: Entry) -> int:
+        return entry.__pending if isinstance(entry, Directory) else 0
+
+    def load_all(self, max_workers: Optional[int] = None) -> None:
+        # 配下のまだ読んでいないLazyDirectoryを(読み込みを起こさずに)集めて，まとめて並列に読む
+        # __pendingが0の部分木には読んでいないものがないので，中へは入らない
+        frontier = []
+        stack: List[Directory] = [self]
+        while stack:
+            d = stack.pop()
+            if not d.__pending:
+                continue
+            if isinstance(d, LazyDirectory):
+                path = d._start_loading()
+                if path is not None:
+                    frontier.append((d, path))
+                    continue
+            stack.extend(c for c in d.__directory if isinstance(c, Directory))
+        if frontier:
+            _load_parallel(frontier, max_workers)
+
+    def enable_index(self) -> "NameIndex":
+        # このDirectory以下に索引を作る．以後のadd/removeで索引も更新される
+        # 索引には全部の名前が要るので，読んでいないLazyDirectoryは先にまとめて読む
+        # すでに(祖先の)索引に載っているなら，作り直さずにその索引を返す
+        # (作り直すと，この部分木への変更が祖先の索引に届かなくなる)
+        if self.__index is not None:
+            return self.__index
+        self.load_all()
+        index = NameIndex(self)
+        self.__index = index
+        self.__children = {}
+        index.register(self)
+        for e in self:
+            self.__attach(e)
+        return index
+
+    def disable_index(self) -> None:
+        # 索引は木全体で1つなので，外せるのは索引を作ったDirectoryからだけ
+        if self.__index is None:
+            return
+        if self.__index.root is not self:
+            raise ValueError(
+                "disable_index must be called on {}".format(self.__index.root.name)
+            )
+        for e, _ in walk(self):
+            if isinstance(e, Directory):
+                e.__index = None
+                e.__children = None
+
+    def __attach(self, entry: Entry) -> None:  # entryの部分木を索引に載せる
+        self.__children[entry.name] = entry
+        index = self.__index
+        for e, _ in walk(entry):
+            index.register(e)
+            if isinstance(e, Directory) and e.__index is not index:
+                # 先に空のdictを置いておく．LazyDirectoryはここで読み込みが起き，
+                # そのadd_manyからも子が索引に載る(同じEntryを2回載せても結果は同じ)
+                e.__children = {}
+                e.__index = index
+                for c in e:
+                    e.__children[c.name] = c
+
+    def __detach(self, entry: Entry) -> None:  # entryの部分木を索引から外す
+        if self.__children.get(entry.name) is entry:
+            del self.__children[entry.name]
+        for e, _ in walk(entry):
+            self.__index.unregister(e)
+            if isinstance(e, Directory):
+                e.__index = None
+                e.__children = None
+
+    def lookup(self, path: str) -> Optional[Entry]:
+        # "/root/usr/yuki/diary.html"のようなパスで引く．索引があれば各段でdictを1回引くだけ
+        names = path.strip("/").split("/")
+        if names[0] != self.__name:
+            return None
+        entry: Entry = self
+        for name in names[1:]:
+            if not isinstance(entry, Directory):
+                return None
+            entry = entry.__child(name)
+            if entry is None:
+                return None
+        return entry
+
+    def __child(self, name: str) -> Optional[Entry]:
+        if self.__children is not None:
+            return self.__children.get(name)
+        for e in self:
+            if e.name == name:
+                return e
+        return None
+
+    def find(self, name: str) -> List[Entry]:  # 名前が一致するEntryをすべて返す
+        if self.__index is not None:
+            return self.__within(self.__index.find(name))
+        return [e for e, _ in walk(self) if e.name == name]
+
+    # "*.html"のようなパターンに合うEntryを返す
+    def glob(self, pattern: str) -> List[Entry]:
+        if self.__index is not None:
+            return self.__within(self.__index.glob(pattern))
+        return [e for e, _ in walk(self) if fnmatchcase(e.name, pattern)]
+
+    def __within(self, entries: List[Entry]) -> List[Entry]:
+        # 索引は索引を作ったDirectory以下全体のものなので，自分の部分木のものだけに絞る
+        if self.__index.root is self:
+            return entries
+        result = []
+        for e in entries:
+            d: Optional[Entry] = e
+            while d is not None and d is not self:
+                d = d.parent
+            if d is self:
+                result.append(e)
+        return result
+
+    def __iter__(self) -> Iterator[Entry]:
+        return iter(self.__directory)
+
+    def _propagate_size(self, delta: int, pending: int = 0) -> None:
+        # 親への逆参照をたどって祖先の合計サイズ(と読んでいないLazyDirectoryの数)を更新する
+        # (再帰ではなくループ)
+        d: Optional[Directory] = self
+        while d is not None:
+            d.__size += delta
+            d.__pending += pending
+            d = d._parent
+
+
+class NameIndex:
+    # 木全体の名前→Entryと，拡張子→Entryの索引．Directory.enable_indexで作られる
+    # 同じ名前のEntryは複数ありうるので，id()をキーにしたdictで追加順に持つ
+    def __init__(self, root: "Directory") -> None:
+        self.__root = root
+        self.__by_name: Dict[str, Dict[int, Entry]] = {}
+        self.__by_suffix: Dict[str, Dict[int, Entry]] = {}
+
+    @property
+    def root(self) -> "Directory":
+        return self.__root
+
+    def register(self, entry: Entry) -> None:
+        name = entry.name
+        self.__by_name.setdefault(name, {})[id(entry)] = entry
+        i = name.rfind(".")
+        # fnmatchcaseでは"*.html"が".html"にも合うので，先頭の"."からも拡張子として載せる
+        if i >= 0:
+            self.__by_suffix.setdefault(name[i:], {})[id(entry)] = entry
+
+    def unregister(self, entry: Entry) -> None:
+        name = entry.name
+        self.__discard(self.__by_name, name, entry)
+        i = name.rfind(".")
+        if i >= 0:
+            self.__discard(self.__by_suffix, name[i:], entry)
+
+    @staticmethod
+    def __discard(table: Dict[str, Dict[int, Entry]], key: str, entry: Entry) -> None:
+        entries = table.get(key)
+        if entries is not None:
+            entries.pop(id(entry), None)
+            if not entries:
+                del table[key]
+
+    def find(self, name: str) -> List[Entry]:
+        return list(self.__by_name.get(name, {}).values())
+
+    def glob(self, pattern: str) -> List[Entry]:
+        # "*.html"だけは拡張子の索引を直接引く．それ以外は木ではなく名前の一覧をなめる
+        suffix = pattern[1:]
+        if (
+            pattern.startswith("*.")
+            and suffix.count(".") == 1
+            and not any(c in suffix for c in "*?[")
+        ):
+            return list(self.__by_suffix.get(suffix, {}).values())
+        result = []
+        for name, entries in self.__by_name.items():
+            if fnmatchcase(name, pattern):
+                result.extend(entries.values())
+        return result
+
+
+PRE_ORDER = "pre"
+POST_ORDER = "post"
+BREADTH_FIRST = "bfs"
+
+
+def walk(root: Entry, order: str = PRE_ORDER) -> Iterator[Tuple[Entry, int]]:
+    # 再帰を使わずに(Entry, 深さ)を順に返す走査エンジン
+    # 自前のスタック(幅優先ならキュー)を使うので，何段ネストしていてもRecursionErrorにならない
+    if order == PRE_ORDER:
+        yield root, 0
+        stack = [iter(root)]
+        while stack:
+            e = next(stack[-1], None)
+            if e is None:
+                stack.pop()
+                continue
+            yield e, len(stack)
+            stack.append(iter(e))
+    elif order == POST_ORDER:
+        stack = [(root, iter(root))]
+        while stack:
+            e = next(stack[-1][1], None)
+            if e is None:
+                yield stack.pop()[0], len(stack)
+                continue
+            stack.append((e, iter(e)))
+    elif order == BREADTH_FIRST:
+        queue = deque([(root, 0)])
+        while queue:
+            e, depth = queue.popleft()
+            yield e, depth
+            queue.extend((c, depth + 1) for c in e)
+    else:
+        raise ValueError("unknown order: {}".format(order))
+
+
+class TreeStore:
+    # 木全体を列指向(配列)で持つストア．ノードは追加順の整数インデックスで表す
+    # ・親は必ず子より先に追加されるので，インデックスの逆順に1回なめるだけで
+    #   配下の合計サイズを下から集計できる(再帰もPythonオブジェクトの木も不要)
+    # ・FileView/DirectoryViewはこのストアの上に被せたEntryで，既存のAPIのまま扱える
+    def __init__(self) -> None:
+        self.__parents = array("q")  # 親のインデックス．ルートは-1
+        self.__depths = array("l")
+        self.__sizes = array("q")  # Fileは自身のサイズ，Directoryは0
+        self.__is_dir = array("b")
+        self.__name_ids = array("l")
+        self.__names: List[str] = []  # 同じ名前は1つにまとめて持つ(インターン)
+        self.__name_table: Dict[str, int] = {}
+        # 集計結果と子の一覧(CSR形式)のキャッシュ．変更があれば捨てる
+        self.__totals: Optional[array] = None
+        self.__child_start: Optional[array] = None
+        self.__child_index: Optional[array] = None
+
+    def __len__(self) -> int:
+        return len(self.__parents)
+
+    def __append(self, name: str, size: int, is_dir: bool, parent: int) -> int:
+        if parent >= 0:
+            assert self.__is_dir[parent]
+            depth = self.__depths[parent] + 1
+        else:
+            depth = 0
+        name_id = self.__name_table.get(name)
+        if name_id is None:
+            name_id = self.__name_table[name] = len(self.__names)
+            self.__names.append(name)
+        self.__parents.append(parent)
+        self.__depths.append(depth)
+        self.__sizes.append(size)
+        self.__is_dir.append(is_dir)
+        self.__name_ids.append(name_id)
+        self.__totals = None
+        self.__child_start = self.__child_index = None
+        return len(self.__parents) - 1
+
+    def add_directory(self, name: str, parent: int = -1) -> int:
+        return self.__append(name, 0, True, parent)
+
+    def add_file(self, name: str, size: int, parent: int) -> int:
+        return self.__append(name, size, False, parent)
+
+    def resize(self, index: int, size: int) -> None:
+        assert not self.__is_dir[index]
+        self.__sizes[index] = size
+        self.__totals = None
+
+    def name(self, index: int) -> str:
+        return self.__names[self.__name_ids[index]]
+
+    def parent(self, index: int) -> int:
+        return self.__parents[index]
+
+    def depth(self, index: int) -> int:
+        return self.__depths[index]
+
+    def is_directory(self, index: int) -> bool:
+        return bool(self.__is_dir[index])
+
+    def size(self, index: int) -> int:
+        return self.rollup()[index]
+
+    def rollup(self) -> array:  # 全ノードの(配下を含む)サイズを一括で計算する
+        if self.__totals is None:
+            if np is not None:
+                self.__totals = self.__rollup_numpy()
+            else:
+                totals = array("q", self.__sizes)
+                parents = self.__parents
+                for i in range(len(totals) - 1, -1, -1):
+                    p = parents[i]
+                    if p >= 0:
+                        totals[p] += totals[i]
+                self.__totals = totals
+        return self.__totals
+
+    def __rollup_numpy(self) -> array:
+        # 深さごとにノードをまとめ，深い段から順にnp.add.atで親へ足し込む
+        if not self.__parents:
+            return array("q")
+        parents = np.frombuffer(self.__parents, dtype=np.int64)
+        depths = np.frombuffer(self.__depths, dtype=np.dtype("l"))
+        totals = np.frombuffer(self.__sizes, dtype=np.int64).copy()
+        order = np.argsort(depths, kind="stable")
+        bounds = np.searchsorted(depths[order], np.arange(int(depths.max()) + 2))
+        for d in range(len(bounds) - 2, 0, -1):
+            lo, hi = bounds[d], bounds[d + 1]
+            level = order[lo:hi]
+            np.add.at(totals, parents[level], totals[level])
+        return array("q", totals.tobytes())
+
+    def children(self, index: int) -> array:
+        if self.__child_start is None:
+            # 親ごとに子を数えてから並べる(計数ソート)．追加順は保たれる
+            n = len(self.__parents)
+            start = array("q", bytes(8 * (n + 1)))
+            for p in self.__parents:
+                if p >= 0:
+                    start[p + 1] += 1
+            for i in range(n):
+                start[i + 1] += start[i]
+            fill = array("q", start)
+            child_index = array("q", bytes(8 * n))
+            for i, p in enumerate(self.__parents):
+                if p >= 0:
+                    child_index[fill[p]] = i
+                    fill[p] += 1
+            self.__child_start, self.__child_index = start, child_index
+        lo, hi = self.__child_start[index], self.__child_start[index + 1]
+        return self.__child_index[lo:hi]
+
+    def view(self, index: int) -> "Entry":
+        if self.__is_dir[index]:
+            return DirectoryView(self, index)
+        return FileView(self, index)
+
+    @classmethod  # 既存のFile/Directoryの木を取り込む
+    def from_entry(cls, root: Entry) -> "TreeStore":
+        store = cls()
+        stack = [(root, -1)]
+        while stack:
+            entry, parent = stack.pop()
+            if isinstance(entry, Directory):
+                index = store.add_directory(entry.name, parent)
+                stack.extend((e, index) for e in reversed(list(entry)))
+            else:
+                store.add_file(entry.name, entry.size, parent)
+        return store
+
+
+class FileView(Entry):
+    __slots__ = ("__store", "__index")
+
+    def __init__(self, store: TreeStore, index: int) -> None:
+        super().__init__()
+        self.__store = store
+        self.__index = index
+
+    @property
+    def parent(self) -> Optional["DirectoryView"]:
+        p = self.__store.parent(self.__index)
+        return None if p < 0 else DirectoryView(self.__store, p)
+
+    @property
+    def name(self) -> str:
+        return self.__store.name(self.__index)
+
+    @property
+    def size(self) -> int:
+        return self.__store.size(self.__index)
+
+    def print_list(self, prefix: str = ""):
+        print(prefix + "/" + self)
+
+    def resize(self, size: int):
+        self.__store.resize(self.__index, size)
+        return self
+
+
+class DirectoryView(Entry):
+    __slots__ = ("__store", "__index")
+
+    def __init__(self, store: TreeStore, index: int) -> None:
+        super().__init__()
+        self.__store = store
+        self.__index = index
+
+    @property
+    def parent(self) -> Optional["DirectoryView"]:
+        p = self.__store.parent(self.__index)
+        return None if p < 0 else DirectoryView(self.__store, p)
+
+    @property
+    def name(self) -> str:
+        return self.__store.name(self.__index)
+
+    @property
+    def size(self) -> int:
+        return self.__store.size(self.__index)
+
+    def print_list(self, prefix: str = ""):
+        self.write_list(prefix=prefix)
+
+    def add(self, entry: Entry):  # Entryの木をこのディレクトリの下にコピーする
+        stack = [(entry, self.__index)]
+        while stack:
+            e, parent = stack.pop()
+            if isinstance(e, (Directory, DirectoryView)):
+                index = self.__store.add_directory(e.name, parent)
+                stack.extend((c, index) for c in reversed(list(e)))
+            else:
+                self.__store.add_file(e.name, e.size, parent)
         return self
 
+    def __iter__(self) -> Iterator[Entry]:
+        return (self.__store.view(i) for i in self.__store.children(self.__index))
+
+
+def _scan(path: str) -> List[Tuple[str, bool, int]]:
+    # os.scandirで1段だけ読み，(名前, ディレクトリか, サイズ)を名前順に返す
+    # 読めないものは飛ばす(権限がない，途中で消えた，など)
+    result = []
+    try:
+        with os.scandir(path) as it:
+            for e in it:
+                try:
+                    if e.is_dir(follow_symlinks=False):
+                        result.append((e.name, True, 0))
+                    else:
+                        size = e.stat(follow_symlinks=False).st_size
+                        result.append((e.name, False, size))
+                except OSError:
+                    continue
+    except OSError:
+        pass
+    result.sort()
+    return result
+
+
+def _fill(
+    directory: Directory, path: str, scanned: List[Tuple[str, bool, int]], lazy: bool
+) -> List[Tuple[Directory, str]]:
+    # _scanの結果からdirectoryの子を作る．中身をまだ読んでいない子Directoryを返す
+    children: List[Entry] = []
+    pending = []
+    for name, is_dir, size in scanned:
+        if is_dir:
+            sub_path = os.path.join(path, name)
+            d = LazyDirectory(name, sub_path) if lazy else Directory(name)
+            children.append(d)
+            pending.append((d, sub_path))
+        else:
+            children.append(File(name, size))
+    Directory.add_many(directory, children)  # LazyDirectory.add_manyだと読み込みが走る
+    return pending
+
+
+def _load_parallel(
+    frontier: List[Tuple[Directory, str]], max_workers: Optional[int]
+) -> None:
+    # 同じ段のディレクトリをスレッドプールで並列にscandirし，1段ずつ下へ進む
+    # scandirやstatはI/Oの間GILを手放すので，スレッドでも並列に読める
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        while frontier:
+            scanned = pool.map(_scan, [path for _, path in frontier])
+            next_frontier = []
+            for (d, path), entries in zip(frontier, scanned):
+                next_frontier.extend(_fill(d, path, entries, lazy=False))
+            frontier = next_frontier
+
+
+def load_tree(
+    path: str, max_workers: Optional[int] = None, lazy: bool = False
+) -> Directory:
+    # 実際のディレクトリからFile/Directoryの木を作る
+    # lazy=Trueなら，各ディレクトリは最初に子へアクセスしたときに初めて読まれる
+    name = os.path.basename(os.path.normpath(path)) or path
+    if lazy:
+        return LazyDirectory(name, path)
+    root = Directory(name)
+    _load_parallel([(root, path)], max_workers)
+    return root
+
+
+class LazyDirectory(Directory):
+    # 最初に子へアクセスしたときに初めて1段だけscandirするDirectory
+    # sizeは配下全体を読まないと決まらないので，sizeを読むと部分木をまとめて並列に読む
+    # (普通のDirectoryの下に入れても同じ．祖先のsizeもこれを読んでから返す)
+    __slots__ = ("__path", "__loaded")
+
+    def __init__(self, name: str, path: str) -> None:
+        super().__init__(name)
+        self.__path = path
+        self.__loaded = False  # 自分の直下を読んだか
+        self._propagate_size(0, 1)
+
+    def add(self, entry: Entry):
+        self.__load()
+        return super().add(entry)
+
+    def add_many(self, entries: Iterable[Entry]):
+        self.__load()
+        return super().add_many(entries)
+
+    def remove(self, entry: Entry):
+        self.__load()
+        return super().remove(entry)
+
+    def __iter__(self) -> Iterator[Entry]:
+        self.__load()
+        return super().__iter__()
+
+    def __load(self) -> None:
+        path = self._start_loading()
+        if path is not None:
+            _fill(self, path, _scan(path), lazy=True)
+
+    def _start_loading(self) -> Optional[str]:
+        # まだ読んでいなければ読んだ印を付けて(祖先の数も減らして)パスを返す．読んであればNone
+        # 中身を埋めるのは呼び出し側(__loadかload_all)
+        if self.__loaded:
+            return None
+        self.__loaded = True
+        self._propagate_size(0, -1)
+        return self.__path
+
 
 class Main:
     def __init__(self) -> None:  # Javaのmain関数を模して，これをmainとする
@@ -112,4 +780,5 @@ class Main:
         rootdir.print_list()
 
 
-Main()
+if __name__ == "__main__":
+    Main()
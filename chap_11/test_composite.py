@@ -0,0 +1,141 @@
+"""
+composite.pyの確認用のテスト(python -m unittest で実行する)
+"""
+
+import io
+import os
+import tempfile
+import unittest
+
+from composite import Directory, File, LazyDirectory, load_tree
+
+
+def make_tree(base: str) -> None:
+    # base/p/q/z.txt (5), base/p/r.txt (3), base/top.html (2)
+    os.makedirs(os.path.join(base, "p", "q"))
+    for path, text in (("p/q/z.txt", "hello"), ("p/r.txt", "abc"), ("top.html", "ab")):
+        with open(os.path.join(base, path), "w") as f:
+            f.write(text)
+
+
+def listing(entry) -> str:
+    s = io.StringIO()
+    entry.write_list(s)
+    return s.getvalue()
+
+
+class AddTest(unittest.TestCase):
+    def test_cycle_is_rejected(self):
+        a = Directory("a")
+        b = Directory("b")
+        c = Directory("c")
+        a.add(b)
+        b.add(c)
+        for parent, child in ((a, a), (c, a), (c, b)):
+            with self.assertRaises(ValueError):
+                parent.add(child)
+        with self.assertRaises(ValueError):
+            c.add_many([File("f", 1), a])
+        self.assertEqual([e.name for e in c], [])
+
+    def test_double_add_is_rejected(self):
+        f = File("f", 3)
+        a = Directory("a")
+        b = Directory("b")
+        a.add(f)
+        with self.assertRaises(ValueError):
+            b.add(f)
+        with self.assertRaises(ValueError):
+            b.add_many([File("g", 1), File("g", 1), f])
+        g = File("g", 1)
+        with self.assertRaises(ValueError):
+            b.add_many([g, g])
+        self.assertEqual((a.size, b.size), (3, 0))
+
+
+class LazyTest(unittest.TestCase):
+    def setUp(self):
+        self.__tmp = tempfile.TemporaryDirectory()
+        self.base = os.path.join(self.__tmp.name, "data")
+        make_tree(self.base)
+
+    def tearDown(self):
+        self.__tmp.cleanup()
+
+    def test_lazy_listing_matches_eager(self):
+        self.assertEqual(
+            listing(load_tree(self.base, lazy=True)), listing(load_tree(self.base))
+        )
+
+    def test_lazy_under_eager_parent(self):
+        # 普通のDirectoryの下に，まだ読んでいないLazyDirectoryを入れる
+        home = Directory("home")
+        lazy = load_tree(self.base, lazy=True)
+        self.assertIsInstance(lazy, LazyDirectory)
+        home.add(lazy)
+        self.assertEqual(home.size, 10)
+        self.assertEqual(lazy.size, 10)
+
+        root = Directory("root")
+        root.add(Directory("usr").add(load_tree(self.base, lazy=True)))
+        self.assertEqual(
+            listing(root).splitlines()[:3],
+            ["/root (10)", "/root/usr (10)", "/root/usr/data (10)"],
+        )
+
+    def test_partly_loaded_lazy_under_eager_parent(self):
+        # 1段だけ読んだ(子のLazyDirectoryはまだ読んでいない)状態で普通のDirectoryの下に入れる
+        home = Directory("home")
+        lazy = load_tree(self.base, lazy=True)
+        self.assertEqual([e.name for e in lazy], ["p", "top.html"])
+        home.add_many([lazy, File("other", 1)])
+        self.assertEqual(home.size, 11)
+        home.remove(lazy)
+        self.assertEqual(home.size, 1)
+
+    def test_index_on_eager_parent_loads_lazy(self):
+        home = Directory("home")
+        home.add(load_tree(self.base, lazy=True))
+        home.enable_index()
+        self.assertEqual(sorted(e.name for e in home.glob("*.txt")), ["r.txt", "z.txt"])
+        self.assertEqual(home.lookup("/home/data/p/q/z.txt").size, 5)
+
+
+def names(entries) -> list:
+    return sorted(e.name for e in entries)
+
+
+class IndexTest(unittest.TestCase):
+    def test_glob_agrees_with_and_without_index(self):
+        root = Directory("root")
+        sub = Directory("sub")
+        root.add(sub)
+        sub.add_many([File(".html", 1), File("a.html", 2), File(".bashrc", 3)])
+        for pattern in ("*.html", "*.bashrc", ".*"):
+            expected = names(root.glob(pattern))
+            root.enable_index()
+            self.assertEqual(names(root.glob(pattern)), expected, pattern)
+            root.disable_index()
+        self.assertEqual(names(root.glob("*.html")), [".html", "a.html"])
+        root.enable_index()
+        sub.remove(sub.lookup("/sub/.html"))
+        self.assertEqual(names(root.glob("*.html")), ["a.html"])
+
+    def test_subdirectory_shares_the_ancestor_index(self):
+        root = Directory("root")
+        sub = Directory("sub")
+        root.add(sub)
+        index = root.enable_index()
+        self.assertIs(sub.enable_index(), index)
+        sub.add(File("n.txt", 1))
+        self.assertEqual([e.name for e in root.find("n.txt")], ["n.txt"])
+        with self.assertRaises(ValueError):
+            sub.disable_index()
+        self.assertEqual(len(root.find("n.txt")), 1)
+        root.disable_index()
+        sub.disable_index()  # 索引がなければ何もしない
+        self.assertEqual(len(root.find("n.txt")), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
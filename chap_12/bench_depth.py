@@ -0,0 +1,100 @@
+"""
+飾りを1000段(と10000段)まで重ねたDisplayのshowにかかる時間を測るベンチマーク
+桁数と行数を毎回数え直す以前の実装(NaiveSideBorder/NaiveFullBorder)と比べる
+chap_12のディレクトリで python bench_depth.py として実行する
+"""
+
+import contextlib
+import io
+import os
+import time
+
+from decorator import CachedDisplay, Display, FullBorder, SideBorder, StringDisplay
+
+
+class NaiveSideBorder(Display):
+    # 比較用: 以前のSideBorderと同じく，聞かれるたびに中身へ聞き直す
+    def __init__(self, display: Display, ch: str) -> None:
+        self.__display = display
+        self.__ch = ch
+
+    # @override
+    def get_columns(self) -> int:
+        return 1 + self.__display.get_columns() + 1
+
+    # @override
+    def get_rows(self) -> int:
+        return self.__display.get_rows()
+
+    # @override
+    def get_row_text(self, row: int) -> str:
+        return self.__ch + self.__display.get_row_text(row) + self.__ch
+
+
+class NaiveFullBorder(Display):
+    # 比較用: 以前のFullBorderと同じく，1行ごとに中身の桁数と行数を数え直す
+    def __init__(self, display: Display) -> None:
+        self.__display = display
+
+    # @override
+    def get_columns(self) -> int:
+        return 1 + self.__display.get_columns() + 1
+
+    # @override
+    def get_rows(self) -> int:
+        return 1 + self.__display.get_rows() + 1
+
+    # @override
+    def get_row_text(self, row: int) -> str:
+        if row == 0 or row == self.__display.get_rows() + 1:
+            return "+" + "-" * self.__display.get_columns() + "+"
+        return "|" + self.__display.get_row_text(row - 1) + "|"
+
+
+def build(depth: int, side, full) -> Display:
+    d: Display = StringDisplay("Hello, world.")
+    for i in range(depth):
+        d = full(d) if i % 2 else side(d, "*")
+    return d
+
+
+def show(display: Display) -> float:
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        start = time.perf_counter()
+        display.show()
+        return time.perf_counter() - start
+
+
+def render(display: Display) -> str:
+    s = io.StringIO()
+    with contextlib.redirect_stdout(s):
+        display.show()
+    return s.getvalue()
+
+
+def main() -> None:
+    # 以前の実装は段数の分だけ再帰するので，既定の再帰の上限では1000段を描けない
+    for depth in (250, 500, 1000, 10000):
+        cached = build(depth, SideBorder, FullBorder)
+        elapsed = show(cached)
+        if depth > 1000:
+            naive = "skipped"
+        else:
+            try:
+                naive_display = build(depth, NaiveSideBorder, NaiveFullBorder)
+                assert render(naive_display) == render(cached)
+                naive = "{:7.3f} s".format(show(naive_display))
+            except RecursionError:
+                naive = "RecursionError"
+        print(
+            "depth {:>5}: naive {:>14}  show {:7.3f} s".format(depth, naive, elapsed)
+        )
+    # 行のキャッシュは，平らにした描画手順の外側に挟む
+    cached = build(1000, SideBorder, FullBorder)
+    rows = CachedDisplay(cached.compile(), cached.get_rows())
+    for n in range(2):
+        print("CachedDisplay pass {}: {:7.3f} s".format(n, show(rows)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+"""
+1つのFrameTemplateで多数の文字列を描くのと，文字列ごとに飾りを組み直すのとを
+1秒あたりのメッセージ数で比べるベンチマーク
+chap_12のディレクトリで python bench_template.py として実行する
+"""
+
+import random
+import time
+
+from decorator import FrameTemplate, FullBorder, SideBorder, StringDisplay
+
+CHAINS = {
+    "SideBorder(FullBorder(d))": lambda d: SideBorder(FullBorder(d), "/"),
+    "b4": lambda d: SideBorder(
+        FullBorder(FullBorder(SideBorder(FullBorder(d), "*"))), "/"
+    ),
+}
+
+
+def main(count: int = 100000) -> None:
+    rng = random.Random(0)
+    messages = ["msg {} {}".format(i, "y" * rng.randint(0, 40)) for i in range(count)]
+    for label, chain in CHAINS.items():
+        start = time.perf_counter()
+        rebuilt = [list(chain(StringDisplay(m)).render_rows()) for m in messages]
+        rebuild = time.perf_counter() - start
+
+        start = time.perf_counter()
+        template = FrameTemplate(chain(StringDisplay("")))
+        rendered = list(template.render_many(messages))
+        batch = time.perf_counter() - start
+
+        assert rebuilt == rendered
+        print(
+            "{:<26} rebuild {:>10,.0f} msg/s  template {:>10,.0f} msg/s".format(
+                label, count / rebuild, count / batch
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -12,7 +12,10 @@ Decoratorパターン
 """
 
 from abc import ABC, abstractmethod
-from typing import final
+from array import array
+from collections import OrderedDict
+from itertools import accumulate, repeat
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, final
 
 
 class Display(ABC):
@@ -30,8 +33,33 @@ class Display(ABC):
 
     @final
     def show(self) -> None:
-        for i in range(self.get_rows()):
-            print(self.get_row_text(i))
+        # 飾りの段数だけ再帰しないよう，平らな描画手順にしてから描く
+        for text in self.compile().render_rows():
+            print(text)
+
+    def render_rows(self, start: int = 0, stop: Optional[int] = None) -> Iterator[str]:
+        # start行目からstop行目の手前までだけを作って返す(stopを省くと最後まで)
+        # 飾りはそれぞれ，自分の行番号を中身の行番号に直して中身のrender_rowsに任せる
+        start, stop = _clamp(start, stop, self.get_rows())
+        for i in range(start, stop):
+            yield self.get_row_text(i)
+
+    @final
+    def compile(self) -> "CompiledDisplay":
+        # 飾りの入れ子を外側から1回だけたどって，平らな描画手順にする
+        # 平らにできない段(_compileを持たないDisplay)に着いたら，そこを中身として止める
+        plan = _PlanBuilder()
+        display: Display = self
+        while True:
+            inner = display._compile(plan)
+            if inner is None:
+                break
+            display = inner
+        return plan.build(display)
+
+    def _compile(self, plan: "_PlanBuilder") -> Optional["Display"]:
+        # 自分の分の枠をplanに足して，内側のDisplayを返す．平らにできなければNone
+        return None
 
 
 class StringDisplay(Display):
@@ -52,6 +80,54 @@ class StringDisplay(Display):
         return self.__string
 
 
+class TextDisplay(Display):
+    # 複数行の文字列を表示する．行ごとの文字列は持たず，1本の長い文字列と
+    # 各行の先頭位置の配列だけを持つ．足りない分は右を空白で埋めて幅を揃える
+    def __init__(self, text: str) -> None:
+        lines = text.split("\n")
+        self.__text = text
+        # i行目は__text[__offsets[i]:__offsets[i + 1] - 1] (-1は改行の分)
+        # 最後の行にも改行がある体で数えるので，__offsets[-1]はlen(text) + 1
+        self.__offsets = array(
+            "q", accumulate(map((1).__add__, map(len, lines)), initial=0)
+        )
+        self.__columns = max(map(len, lines))
+
+    @classmethod
+    def from_file(cls, filename: str, encoding: Optional[str] = None) -> "TextDisplay":
+        with open(filename, encoding=encoding) as f:
+            text = f.read()
+        if text.endswith("\n"):
+            text = text[:-1]
+        return cls(text)
+
+    # @override
+    def get_columns(self) -> int:
+        return self.__columns
+
+    # @override
+    def get_rows(self) -> int:
+        return len(self.__offsets) - 1
+
+    # @override
+    def get_row_text(self, row: int) -> str:
+        assert 0 <= row < self.get_rows()
+        lo = self.__offsets[row]
+        hi = self.__offsets[row + 1] - 1
+        return self.__text[lo:hi].ljust(self.__columns)
+
+    # @override
+    def render_rows(self, start: int = 0, stop: Optional[int] = None) -> Iterator[str]:
+        # 範囲の行をまとめて1回で切り出し，splitとmapでまとめて幅を揃える
+        start, stop = _clamp(start, stop, self.get_rows())
+        if start >= stop:
+            return iter(())
+        lo = self.__offsets[start]
+        hi = self.__offsets[stop] - 1
+        lines = self.__text[lo:hi].split("\n")
+        return map(str.ljust, lines, repeat(self.__columns))
+
+
 class Border(Display):
     def __init__(self, display: Display) -> None:
         self._display: Display = display
@@ -62,41 +138,273 @@ class SideBorder(Border):
         assert len(ch) == 1
         super().__init__(display)
         self.__border_char = ch
+        # 中身は後から変わらないので，桁数と行数は作るときに1回だけ数えておく
+        # (毎回数えると，デコレータの段数dに対して1行あたりO(d^2)になる)
+        self.__columns = 1 + display.get_columns() + 1
+        self.__rows = display.get_rows()
 
     # @override
     def get_columns(self) -> int:
-        return 1 + self._display.get_columns() + 1
+        return self.__columns
 
     # @override
     def get_rows(self) -> int:
-        return self._display.get_rows()
+        return self.__rows
 
     # @override
     def get_row_text(self, row: int) -> str:
         return self.__border_char + self._display.get_row_text(row) + self.__border_char
 
+    # @override
+    def render_rows(self, start: int = 0, stop: Optional[int] = None) -> Iterator[str]:
+        ch = self.__border_char
+        yield from _wrap(self._display.render_rows(start, stop), ch, ch)
+
+    # @override
+    def _compile(self, plan: "_PlanBuilder") -> Optional[Display]:
+        plan.frame(None, self.__border_char, self.__border_char)
+        return self._display
+
 
 class FullBorder(Border):
     def __init__(self, display: Display) -> None:
         super().__init__(display)
+        self.__columns = 1 + display.get_columns() + 1
+        self.__rows = 1 + display.get_rows() + 1
+        # 上下の罫線はどの行でも同じなので，1本だけ作っておく
+        self.__rule = "+" + "-" * display.get_columns() + "+"
 
     # @override
     def get_columns(self) -> int:
-        return 1 + self._display.get_columns() + 1
+        return self.__columns
 
     # @override
     def get_rows(self) -> int:
-        return 1 + self._display.get_rows() + 1
+        return self.__rows
 
     # @override
     def get_row_text(self, row: int) -> str:
         if row == 0:
-            return "+" + "-" * self._display.get_columns() + "+"
-        elif row == self._display.get_rows() + 1:
-            return "+" + "-" * self._display.get_columns() + "+"
+            return self.__rule
+        elif row == self.__rows - 1:
+            return self.__rule
         else:
             return "|" + self._display.get_row_text(row - 1) + "|"
 
+    # @override
+    def render_rows(self, start: int = 0, stop: Optional[int] = None) -> Iterator[str]:
+        # 0行目と最後の行は罫線，その間のi行目は中身のi-1行目
+        start, stop = _clamp(start, stop, self.__rows)
+        if start >= stop:
+            return
+        if start == 0:
+            yield self.__rule
+        inner = self._display.render_rows(
+            max(start - 1, 0), min(stop, self.__rows - 1) - 1
+        )
+        yield from _wrap(inner, "|", "|")
+        if stop == self.__rows:
+            yield self.__rule
+
+    # @override
+    def _compile(self, plan: "_PlanBuilder") -> Optional[Display]:
+        plan.frame(self.__rule, "|", "|")
+        return self._display
+
+
+class CachedDisplay(Border):
+    # 中身のget_row_textの結果を，最近使ったmaxsize行まで覚えておく飾り
+    # 見た目は変えないので，どの段に挟んでも表示は同じ
+    def __init__(self, display: Display, maxsize: int = 1024) -> None:
+        assert maxsize > 0
+        super().__init__(display)
+        self.__maxsize = maxsize
+        self.__cache: OrderedDict[int, str] = OrderedDict()
+
+    # @override
+    def get_columns(self) -> int:
+        return self._display.get_columns()
+
+    # @override
+    def get_rows(self) -> int:
+        return self._display.get_rows()
+
+    # @override
+    def get_row_text(self, row: int) -> str:
+        text = self.__cache.get(row)
+        if text is not None:
+            self.__cache.move_to_end(row)
+            return text
+        text = self._display.get_row_text(row)
+        self.__cache[row] = text
+        if len(self.__cache) > self.__maxsize:
+            self.__cache.popitem(last=False)  # 一番長く使っていない行を捨てる
+        return text
+
+
+class _PlanBuilder:
+    # compile()が外側から内側へ枠を積んでいくための作業場所
+    def __init__(self) -> None:
+        self.__left = ""
+        self.__right = ""
+        self.__top: List[str] = []
+        self.__bottom: List[str] = []  # 外側の罫線から順に入る
+
+    def frame(self, rule: Optional[str], left: str, right: str) -> None:
+        # ruleがあれば，今までの左右の枠で挟んだ罫線を上下に1行ずつ足してから，左右の枠を1段厚くする
+        if rule is not None:
+            row = self.__left + rule + self.__right
+            self.__top.append(row)
+            self.__bottom.append(row)
+        self.__left += left
+        self.__right = right + self.__right
+
+    def build(self, inner: Display) -> "CompiledDisplay":
+        self.__bottom.reverse()
+        return CompiledDisplay(
+            inner, self.__left, self.__right, self.__top, self.__bottom
+        )
+
+
+class CompiledDisplay(Display):
+    # compile()の結果．上下の罫線は出来上がった文字列のまま持ち，
+    # 中身の行は「左の枠 + 中身 + 右の枠」の1回の連結で作る
+    def __init__(
+        self,
+        inner: Display,
+        left: str,
+        right: str,
+        top: List[str],
+        bottom: List[str],
+    ) -> None:
+        self.__inner = inner
+        self.__left = left
+        self.__right = right
+        self.__top = tuple(top)
+        self.__bottom = tuple(bottom)
+        self.__inner_rows = inner.get_rows()
+        self.__columns = len(left) + inner.get_columns() + len(right)
+        self.__rows = len(top) + self.__inner_rows + len(bottom)
+
+    # @override
+    def get_columns(self) -> int:
+        return self.__columns
+
+    # @override
+    def get_rows(self) -> int:
+        return self.__rows
+
+    # @override
+    def get_row_text(self, row: int) -> str:
+        assert 0 <= row < self.__rows
+        row -= len(self.__top)
+        if row < 0:
+            return self.__top[row]
+        if row >= self.__inner_rows:
+            return self.__bottom[row - self.__inner_rows]
+        return self.__left + self.__inner.get_row_text(row) + self.__right
+
+    # @override
+    def render_rows(self, start: int = 0, stop: Optional[int] = None) -> Iterator[str]:
+        start, stop = _clamp(start, stop, self.__rows)
+        n_top = len(self.__top)
+        lo = min(start, n_top)
+        hi = min(stop, n_top)
+        yield from self.__top[lo:hi]
+        left = self.__left
+        right = self.__right
+        inner_start = max(start - n_top, 0)
+        inner_stop = min(stop - n_top, self.__inner_rows)
+        inner = self.__inner.render_rows(inner_start, inner_stop)
+        yield from _wrap(inner, left, right)
+        lo = max(start - n_top - self.__inner_rows, 0)
+        hi = max(stop - n_top - self.__inner_rows, 0)
+        yield from self.__bottom[lo:hi]
+
+
+class FrameTemplate:
+    # 飾りの入れ子を型紙にして，いろいろな1行の文字列を同じ飾りで描く
+    # 例: FrameTemplate(SideBorder(FullBorder(StringDisplay("")), "/"))
+    # 一番内側のStringDisplayの中身は使わず，描くたびに渡された文字列に差し替える
+    # 左右の枠は幅によらないので1回だけ作り，上下の罫線は幅ごとに1回だけ作って覚えておく
+    def __init__(self, display: Display) -> None:
+        recorder = _StepRecorder()
+        while True:
+            inner = display._compile(recorder)
+            if inner is None:
+                break
+            display = inner
+        assert isinstance(display, StringDisplay)
+        self.__steps = recorder.get_steps()
+        self.__left = "".join(left for _, left, _ in self.__steps)
+        self.__right = "".join(right for _, _, right in reversed(self.__steps))
+        self.__rules: Dict[int, Tuple[Tuple[str, ...], Tuple[str, ...]]] = {}
+
+    def render(self, string: str) -> List[str]:
+        # 飾りの入れ子でstringを包んだときのshow()の各行
+        top, bottom = self.__rules_for(len(string))
+        return [*top, self.__left + string + self.__right, *bottom]
+
+    def render_many(self, strings: Iterable[str]) -> Iterator[List[str]]:
+        # 文字列ごとにrenderした結果を順に返す
+        rules = self.__rules
+        left = self.__left
+        right = self.__right
+        for string in strings:
+            top_bottom = rules.get(len(string))
+            if top_bottom is None:
+                top_bottom = self.__rules_for(len(string))
+            top, bottom = top_bottom
+            yield [*top, left + string + right, *bottom]
+
+    def __rules_for(self, width: int) -> Tuple[Tuple[str, ...], Tuple[str, ...]]:
+        # 中身の幅がwidthのときの上下の罫線の行を作る．compile()と同じく_PlanBuilderで積む
+        rules = self.__rules.get(width)
+        if rules is None:
+            # 各段の内側の幅は，中身の幅にその段より内側の左右の枠の幅を足したもの
+            inner_widths = []
+            w = width
+            for _, left, right in reversed(self.__steps):
+                inner_widths.append(w)
+                w += len(left) + len(right)
+            inner_widths.reverse()
+            plan = _PlanBuilder()
+            for (ruled, left, right), w in zip(self.__steps, inner_widths):
+                plan.frame("+" + "-" * w + "+" if ruled else None, left, right)
+            compiled = plan.build(StringDisplay(" " * width))
+            rows = list(compiled.render_rows())
+            # 上下の罫線は同じ本数で，真ん中の1行が中身
+            n = (len(rows) - 1) // 2
+            top = tuple(rows[:n])
+            del rows[: n + 1]
+            rules = self.__rules[width] = top, tuple(rows)
+        return rules
+
+
+class _StepRecorder:
+    # _PlanBuilderの代わりに_compileへ渡して，幅によらない飾りの手順だけを記録する
+    def __init__(self) -> None:
+        self.__steps: List[Tuple[bool, str, str]] = []
+
+    def frame(self, rule: Optional[str], left: str, right: str) -> None:
+        self.__steps.append((rule is not None, left, right))
+
+    def get_steps(self) -> List[Tuple[bool, str, str]]:
+        return self.__steps
+
+
+def _clamp(start: int, stop: Optional[int], rows: int) -> Tuple[int, int]:
+    # render_rowsの範囲を[0, rows]に収める
+    if stop is None or stop > rows:
+        stop = rows
+    start = max(start, 0)
+    return start, max(start, stop)
+
+
+def _wrap(rows: Iterable[str], left: str, right: str) -> Iterator[str]:
+    # 各行を左右の枠で挟む．1行ずつPythonで連結せず，mapでまとめて処理する
+    return map(str.__add__, map(left.__add__, rows), repeat(right))
+
 
 class Main:
     def __init__(self) -> None:  # Javaのmain関数を模して，これをmainとする
@@ -115,4 +423,5 @@ class Main:
         b4.show()
 
 
-Main()
+if __name__ == "__main__":
+    Main()
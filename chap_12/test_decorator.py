@@ -0,0 +1,81 @@
+"""
+decorator.pyの確認用のテスト(python -m unittest で実行する)
+"""
+
+import contextlib
+import io
+import sys
+import unittest
+
+from decorator import CachedDisplay, FullBorder, SideBorder, StringDisplay, TextDisplay
+
+
+def chain(depth: int):
+    d = StringDisplay("Hello, world.")
+    for i in range(depth):
+        d = FullBorder(d) if i % 2 else SideBorder(d, "*")
+    return d
+
+
+class ShowTest(unittest.TestCase):
+    def test_deep_chain_at_default_recursion_limit(self):
+        self.assertLessEqual(sys.getrecursionlimit(), 1000)
+        for depth in (1000, 5000):
+            d = chain(depth)
+            s = io.StringIO()
+            with contextlib.redirect_stdout(s):
+                d.show()
+            lines = s.getvalue().splitlines()
+            self.assertEqual(len(lines), d.get_rows())
+            self.assertEqual(lines[depth // 4], d.compile().get_row_text(depth // 4))
+            self.assertTrue(all(len(line) == d.get_columns() for line in lines))
+
+
+def displays():
+    # 枠だけの飾り，複数行の中身，途中に挟んだCachedDisplayの組み合わせ
+    text = TextDisplay("first\nsecond line\n\nlast")
+    yield StringDisplay("Hello")
+    yield FullBorder(StringDisplay(""))
+    yield SideBorder(FullBorder(StringDisplay("Hello")), "/")
+    yield SideBorder(
+        FullBorder(FullBorder(SideBorder(FullBorder(StringDisplay("Hello")), "*"))),
+        "/",
+    )
+    yield text
+    yield FullBorder(FullBorder(text))
+    yield FullBorder(SideBorder(FullBorder(text), "#"))
+    yield FullBorder(CachedDisplay(FullBorder(text), 2))
+    yield SideBorder(CachedDisplay(FullBorder(StringDisplay("Hi")), 1), "*")
+    yield CachedDisplay(FullBorder(FullBorder(text)), 3)
+
+
+class RenderRowsTest(unittest.TestCase):
+    def test_window_sweep(self):
+        # (start, stop)のすべての組で，render_rowsがget_row_textを並べたものと一致する
+        for plain in displays():
+            for d in (plain, plain.compile()):
+                rows = d.get_rows()
+                expected = [d.get_row_text(i) for i in range(rows)]
+                self.assertEqual(list(d.render_rows()), expected)
+                for start in range(-1, rows + 2):
+                    for stop in range(start - 1, rows + 3):
+                        with self.subTest(
+                            display=type(d).__name__, start=start, stop=stop
+                        ):
+                            window = list(d.render_rows(start, stop))
+                            lo = max(start, 0)
+                            hi = max(lo, min(stop, rows))
+                            self.assertEqual(window, expected[lo:hi])
+                    lo = max(start, 0)
+                    self.assertEqual(list(d.render_rows(start)), expected[lo:])
+
+    def test_compile_matches_plain(self):
+        for d in displays():
+            compiled = d.compile()
+            self.assertEqual(compiled.get_rows(), d.get_rows())
+            self.assertEqual(compiled.get_columns(), d.get_columns())
+            self.assertEqual(list(compiled.render_rows()), list(d.render_rows()))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+"""
+DispatchVisitorの型ごとの表による呼び分けと，isinstanceの連鎖による呼び分けを
+1秒あたりにvisitしたEntry数で比べるベンチマーク
+chap_13のディレクトリで python bench_dispatch.py として実行する
+"""
+
+import time
+
+from visitor import Directory, DispatchVisitor, File, Visitor
+
+
+class Link(File):  # visit_Fileへフォールバックする，Fileの派生クラス
+    __slots__ = ()
+
+
+class ChainVisitor(Visitor):
+    # 比較用: 以前のVisitorと同じく，Entryごとにisinstanceを順に試す
+    def __init__(self) -> None:
+        self.count = 0
+
+    # @override
+    def visit(self, entry):
+        if isinstance(entry, Link):
+            self.count += 1
+        elif isinstance(entry, File):
+            self.count += 1
+        elif isinstance(entry, Directory):
+            self.count += 1
+            for e in entry:
+                e.accept(self)
+        else:
+            assert False
+
+
+class TableVisitor(DispatchVisitor):
+    def __init__(self) -> None:
+        self.count = 0
+
+    def visit_File(self, entry: File) -> None:
+        self.count += 1
+
+    def visit_Directory(self, entry: Directory) -> None:
+        self.count += 1
+        for e in entry:
+            e.accept(self)
+
+
+def build(dirs: int = 1000, files: int = 500) -> Directory:
+    # FileとLinkが半々に並ぶ，約50万Entryの木
+    root = Directory("root")
+    for i in range(dirs):
+        d = Directory("dir{}".format(i))
+        root.add(d)
+        d.add_many(
+            File("file{}".format(k), 1) if k % 2 else Link("link{}".format(k), 1)
+            for k in range(files)
+        )
+    return root
+
+
+def main(rounds: int = 3) -> None:
+    root = build()
+    for _ in range(rounds):
+        for cls in (ChainVisitor, TableVisitor):
+            v = cls()
+            start = time.perf_counter()
+            root.accept(v)
+            elapsed = time.perf_counter() - start
+            print(
+                "{:<13} {:>9,} nodes {:>12,.0f} nodes/s".format(
+                    cls.__name__, v.count, v.count / elapsed
+                )
+            )
+
+
+if __name__ == "__main__":
+    main()
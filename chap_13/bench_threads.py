@@ -0,0 +1,59 @@
+"""
+1つの木をN個のスレッドから同時にVisitorでなめたときのスループットを測るベンチマーク
+chap_13のディレクトリで python bench_threads.py [スレッド数...] として実行する
+"""
+
+import io
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from visitor import Directory, File, ListVisitor, SizeVisitor, walk
+
+
+def build(dirs: int = 100, subdirs: int = 10, files: int = 20) -> Directory:
+    root = Directory("root")
+    for i in range(dirs):
+        d = Directory("dir{}".format(i))
+        root.add(d)
+        for j in range(subdirs):
+            s = Directory("sub{}".format(j))
+            d.add(s)
+            s.add_many(File("file{}.txt".format(k), k) for k in range(files))
+    return root
+
+
+def run_list(root: Directory) -> str:
+    s = io.StringIO()
+    root.accept(ListVisitor(s))
+    return s.getvalue()
+
+
+def run_size(root: Directory) -> int:
+    v = SizeVisitor()
+    root.accept(v)
+    return v.get_total_size()
+
+
+def main(threads) -> None:
+    root = build()
+    count = sum(1 for _ in walk(root))
+    jobs = 32
+    print("{:,} entries x {} jobs".format(count, jobs))
+    for name, job in (("ListVisitor", run_list), ("SizeVisitor", run_size)):
+        expected = job(root)
+        for n in threads:
+            with ThreadPoolExecutor(max_workers=n) as pool:
+                start = time.perf_counter()
+                results = list(pool.map(job, [root] * jobs))
+                elapsed = time.perf_counter() - start
+            status = "ok" if all(r == expected for r in results) else "MISMATCH"
+            print(
+                "{:<12} {:>3} threads {:>12,.0f} nodes/s  {}".format(
+                    name, n, count * jobs / elapsed, status
+                )
+            )
+
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or [1, 2, 4, 8])
@@ -0,0 +1,105 @@
+"""
+walk(明示的なスタックによる走査)と，再帰で書いた走査の速さを比べるベンチマーク
+chap_13のディレクトリで python bench_walk.py として実行する
+"""
+
+import os
+import time
+
+from visitor import (
+    BREADTH_FIRST,
+    POST_ORDER,
+    PRE_ORDER,
+    Directory,
+    File,
+    ListVisitor,
+    walk,
+)
+
+
+def build(dirs: int = 1000, subdirs: int = 10, files: int = 50) -> Directory:
+    # 1000 x 10 x 50 で約51万Entryの木を作る
+    root = Directory("root")
+    for i in range(dirs):
+        d = Directory("dir{}".format(i))
+        root.add(d)
+        for j in range(subdirs):
+            s = Directory("sub{}".format(j))
+            d.add(s)
+            s.add_many(File("file{}.txt".format(k), k) for k in range(files))
+    return root
+
+
+def chain(depth: int) -> Directory:
+    # depth段ネストしたDirectoryの1本道
+    node = File("leaf", 1)
+    for _ in range(depth):
+        d = Directory("d")
+        d.add(node)
+        node = d
+    return node
+
+
+def recursive_walk(entry, depth: int = 0):
+    # 比較用: 以前のaccept/print_listと同じく，1段ごとに再帰する前順走査
+    yield entry, depth
+    if isinstance(entry, Directory):
+        for e in entry:
+            yield from recursive_walk(e, depth + 1)
+
+
+def recursive_size(entry) -> int:
+    if isinstance(entry, Directory):
+        return sum(recursive_size(e) for e in entry)
+    return entry.get_size()
+
+
+def recursive_lines(entry, prefix: str = ""):
+    # 比較用: 以前のListVisitorと同じく，Directoryごとに再帰で配下のサイズをなめ直す
+    path = prefix + "/" + entry.get_name()
+    if isinstance(entry, Directory):
+        yield "{} ({})".format(path, recursive_size(entry))
+        for e in entry:
+            yield from recursive_lines(e, path)
+    else:
+        yield "{} ({})".format(path, entry.get_size())
+
+
+def measure(label: str, func, count: int) -> None:
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    print(
+        "{:<28} {:8.3f} s  {:>12,.0f} nodes/s".format(label, elapsed, count / elapsed)
+    )
+
+
+def consume(it) -> None:
+    for _ in it:
+        pass
+
+
+def main() -> None:
+    root = build()
+    count = sum(1 for _ in walk(root))
+    print("{:,} entries".format(count))
+    measure("recursive pre-order", lambda: consume(recursive_walk(root)), count)
+    for order in (PRE_ORDER, POST_ORDER, BREADTH_FIRST):
+        measure("walk " + order, lambda: consume(walk(root, order)), count)
+    measure("recursive listing", lambda: consume(recursive_lines(root)), count)
+    measure("iter_lines", lambda: consume(root.iter_lines()), count)
+    with open(os.devnull, "w") as devnull:
+        measure("ListVisitor", lambda: root.accept(ListVisitor(devnull)), count)
+
+    for depth in (10000, 100000):
+        deep = chain(depth)
+        try:
+            consume(recursive_walk(deep))
+            print("recursive, depth {}: ok".format(depth))
+        except RecursionError:
+            print("recursive, depth {}: RecursionError".format(depth))
+        measure("walk, depth {}".format(depth), lambda: consume(walk(deep)), depth + 1)
+
+
+if __name__ == "__main__":
+    main()
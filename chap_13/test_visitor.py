@@ -0,0 +1,244 @@
+"""
+visitor.pyの確認用のテスト(python -m unittest で実行する)
+"""
+
+import io
+import sys
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from visitor import (
+    Directory,
+    DispatchVisitor,
+    File,
+    FileFindVisitor,
+    ListVisitor,
+    MultiVisitor,
+    ParallelVisitorExecutor,
+    SizeVisitor,
+)
+
+
+def build(dirs: int = 20, subdirs: int = 5, files: int = 10) -> Directory:
+    root = Directory("root")
+    for i in range(dirs):
+        d = Directory("dir{}".format(i))
+        root.add(d)
+        for j in range(subdirs):
+            s = Directory("sub{}".format(j))
+            d.add(s)
+            s.add_many(File("file{}.txt".format(k), k) for k in range(files))
+    return root
+
+
+def listing(entry) -> str:
+    s = io.StringIO()
+    entry.accept(ListVisitor(s))
+    return s.getvalue()
+
+
+class ConcurrentIterationTest(unittest.TestCase):
+    def test_nested_iteration(self):
+        root = build(dirs=3)
+        pairs = [(a.get_name(), b.get_name()) for a in root for b in root]
+        self.assertEqual(len(pairs), 9)
+        self.assertEqual(pairs[1], ("dir0", "dir1"))
+
+    def test_visitors_from_thread_pool(self):
+        # 1つの木を，スレッドプールから多数のVisitorで同時になめる
+        root = build()
+        expected = listing(root)
+        old = sys.getswitchinterval()
+        sys.setswitchinterval(
+            1e-6
+        )  # スレッドの切り替えを増やして，干渉を起こしやすくする
+        try:
+            with ThreadPoolExecutor(max_workers=8) as pool:
+                outputs = list(pool.map(lambda _: listing(root), range(32)))
+                sizes = list(pool.map(lambda _: self.__count(root), range(32)))
+        finally:
+            sys.setswitchinterval(old)
+        self.assertTrue(all(o == expected for o in outputs))
+        self.assertEqual(set(sizes), {(1000, 121, sum(range(10)) * 100)})
+
+    @staticmethod
+    def __count(root: Directory):
+        v = SizeVisitor()
+        root.accept(v)
+        # 同じ木を入れ子でもう1度なめても，外側の走査は乱れない
+        for d in root:
+            for s in d:
+                FileFindVisitor(".txt").visit(s)
+        return v.get_file_count(), v.get_directory_count(), v.get_total_size()
+
+
+class CountingExecutor(ThreadPoolExecutor):
+    submitted = 0
+
+    def submit(self, *args, **kwargs):
+        CountingExecutor.submitted += 1
+        return super().submit(*args, **kwargs)
+
+
+class CountVisitor(DispatchVisitor):  # forkとjoinを持たないVisitor
+    def visit_Entry(self, entry):
+        pass
+
+    def enter(self, entry, depth):
+        pass
+
+
+class RecursiveVisitor(DispatchVisitor):  # 自分で子へacceptしていく，enterのないVisitor
+    def visit_File(self, entry):
+        pass
+
+    def visit_Directory(self, entry):
+        for e in entry:
+            e.accept(self)
+
+
+class CountingDirectory(Directory):
+    iterations = 0
+    events: list = []
+
+    def __iter__(self):
+        CountingDirectory.iterations += 1
+        CountingDirectory.events.append("iter")
+        return super().__iter__()
+
+
+class EventStream(io.StringIO):
+    def write(self, s):
+        CountingDirectory.events.append("write")
+        return super().write(s)
+
+
+def counting_tree(dirs: int) -> Directory:
+    root = CountingDirectory("root")
+    for i in range(dirs):
+        d = CountingDirectory("dir{}".format(i))
+        root.add(d)
+        d.add_many(File("f{}.txt".format(k), k) for k in range(4))
+    return root
+
+
+class ParallelTest(unittest.TestCase):
+    def test_same_result_as_serial(self):
+        root = build()
+        root.add(File("top.txt", 7))  # 分割する段にあるFile
+        expected = listing(root)
+        for split_depth in (1, 2):
+            executor = ParallelVisitorExecutor(2, ThreadPoolExecutor, split_depth)
+            s = io.StringIO()
+            v = executor.run(root, MultiVisitor(ListVisitor(s), SizeVisitor()))
+            self.assertEqual(s.getvalue(), expected)
+            self.assertEqual(v.get_visitors()[1].get_file_count(), 1001)
+
+    def test_task_count_is_bounded(self):
+        root = build(dirs=200, subdirs=2, files=1)
+        CountingExecutor.submitted = 0
+        executor = ParallelVisitorExecutor(2, CountingExecutor, tasks_per_worker=4)
+        executor.run(root, SizeVisitor())
+        self.assertLessEqual(CountingExecutor.submitted, 8)
+
+    def test_visitor_without_fork_is_rejected(self):
+        executor = ParallelVisitorExecutor(2, CountingExecutor)
+        CountingExecutor.submitted = 0
+        for v in (CountVisitor(), MultiVisitor(SizeVisitor(), CountVisitor())):
+            with self.assertRaises(TypeError):
+                executor.run(build(dirs=2), v)
+        self.assertEqual(CountingExecutor.submitted, 0)
+
+
+class ListVisitorTest(unittest.TestCase):
+    def test_standalone_listing_streams(self):
+        # 単独でacceptしたときは，木をなめ終える前からchunk_lines行ずつ書き出す
+        root = counting_tree(10)
+        CountingDirectory.events = []
+        s = EventStream()
+        root.accept(ListVisitor(s, chunk_lines=2))
+        events = CountingDirectory.events
+        first_write = events.index("write")
+        self.assertIn("iter", events[first_write:])
+        self.assertEqual(s.getvalue().splitlines(), list(root.iter_lines("C:")))
+
+
+class Link(File):  # enter_Fileへフォールバックする，Fileの派生クラス
+    __slots__ = ()
+
+
+class MultiVisitorTest(unittest.TestCase):
+    def test_enter_dispatches_along_the_mro(self):
+        root = Directory("root")
+        root.add_many([File("a.txt", 1), Link("b.txt", 2), Directory("sub")])
+        size = SizeVisitor()
+        find = FileFindVisitor(".txt")
+        root.accept(MultiVisitor(size, find))
+        self.assertEqual(size.get_file_count(), 2)
+        self.assertEqual(size.get_directory_count(), 2)
+        self.assertEqual(size.get_total_size(), 3)
+        self.assertEqual(
+            [f.get_name() for f in find.get_found_files()], ["a.txt", "b.txt"]
+        )
+        self.assertIs(SizeVisitor._enter_table[Link], SizeVisitor.enter_File)
+
+    def test_visitor_without_enter_is_rejected(self):
+        with self.assertRaises(TypeError):
+            MultiVisitor(RecursiveVisitor(), SizeVisitor())
+
+    def test_fused_listing_walks_once(self):
+        root = CountingDirectory("root")
+        for i in range(3):
+            d = CountingDirectory("dir{}".format(i))
+            root.add(d)
+            d.add_many(File("f{}.txt".format(k), k) for k in range(4))
+        expected = listing(root)
+        CountingDirectory.iterations = 0
+        s = io.StringIO()
+        size = SizeVisitor()
+        find = FileFindVisitor(".txt")
+        root.accept(MultiVisitor(ListVisitor(s, chunk_lines=2), size, find))
+        self.assertEqual(CountingDirectory.iterations, 4)  # Directoryごとに1回
+        self.assertEqual(s.getvalue(), expected)
+        self.assertEqual(
+            expected.splitlines()[:2], ["C:/root (18)", "C:/root/dir0 (6)"]
+        )
+        self.assertEqual(size.get_total_size(), 18)
+        self.assertEqual(len(find.get_found_files()), 12)
+
+
+def names(entries) -> list:
+    return sorted(e.get_name() for e in entries)
+
+
+class IndexTest(unittest.TestCase):
+    def test_glob_agrees_with_and_without_index(self):
+        root = Directory("root")
+        sub = Directory("sub")
+        root.add(sub)
+        sub.add_many([File(".html", 1), File("a.html", 2), File(".bashrc", 3)])
+        for pattern in ("*.html", "*.bashrc", ".*"):
+            expected = names(root.glob(pattern))
+            root.enable_index()
+            self.assertEqual(names(root.glob(pattern)), expected, pattern)
+            root.disable_index()
+        self.assertEqual(names(root.glob("*.html")), [".html", "a.html"])
+
+    def test_subdirectory_shares_the_ancestor_index(self):
+        root = Directory("root")
+        sub = Directory("sub")
+        root.add(sub)
+        index = root.enable_index()
+        self.assertIs(sub.enable_index(), index)
+        sub.add(File("n.txt", 1))
+        self.assertEqual([e.get_name() for e in root.find("n.txt")], ["n.txt"])
+        with self.assertRaises(ValueError):
+            sub.disable_index()
+        self.assertEqual(len(root.find("n.txt")), 1)
+        root.disable_index()
+        sub.disable_index()  # 索引がなければ何もしない
+        self.assertEqual(len(root.find("n.txt")), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
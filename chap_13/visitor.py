@@ -10,8 +10,30 @@ Visitorパターン
   受け取る引数によって処理が変わらなければならないのに，メソッドが分かれないのがなんとも変な感じがする．ここはJavaに軍配が上がるか．
 """
 
+import io
+import os
+import sys
 from abc import ABC, abstractmethod
-from typing import List
+from collections import deque
+from concurrent.futures import (
+    Executor,
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+)
+from fnmatch import fnmatchcase
+from typing import (
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    TextIO,
+    Tuple,
+    Type,
+)
 
 
 class Visitor(ABC):
@@ -24,15 +46,106 @@ class Visitor(ABC):
         else:
             assert False
 
+    # 以下はtraverse/MultiVisitorで1回の走査を複数のVisitorで共有するためのフック
+    # ・enterは走査する側から前順にEntryごとに呼ばれる．子へは走査する側が進むので，
+    #   enterの中でacceptしてはいけない
+    # ・leaveはDirectoryの配下をすべてenterし終えたときに，その合計サイズとともに呼ばれる
+    #   サイズの集計には手間がかかるので，uses_directory_sizesがTrueのときだけ呼ばれる
+    # ・finishは走査が終わったあとに1回呼ばれる
+    # visitの中で自分で子へacceptしていくVisitorはenterを持たないので，
+    # traverse/MultiVisitorに渡すとTypeErrorになる
+    uses_directory_sizes = False
+
+    def enter(self, entry: "Entry", depth: int) -> None:
+        raise NotImplementedError
+
+    def leave(self, directory: "Directory", depth: int, size: int) -> None:
+        pass
+
+    def finish(self) -> None:
+        pass
+
+    def supports_enter(self) -> bool:
+        return type(self).enter is not Visitor.enter
+
+    # 以下はParallelVisitorExecutorで部分木ごとに並列実行するためのフック
+    # 両方をオーバーライドしたVisitorだけが並列に実行できる
+    def fork(self, directory: "Directory") -> "Visitor":
+        # directoryの隣り合った子いくつか分の部分木を担当する，新しいVisitorを返す
+        # 返したVisitorは，担当する子それぞれに順にacceptされる
+        raise NotImplementedError
+
+    def join(self, directory: "Directory", results: List["Visitor"]) -> None:
+        # directoryの子の順に並んだforkの結果を，自分にまとめる(reduce)
+        raise NotImplementedError
+
+    def supports_fork(self) -> bool:
+        cls = type(self)
+        return cls.fork is not Visitor.fork and cls.join is not Visitor.join
+
+
+class DispatchVisitor(Visitor):
+    # isinstanceの連鎖の代わりに，visit_File/visit_Directoryのようなメソッドを呼び分けるVisitor
+    # ・呼ぶメソッドはtype(entry)ごとに1回だけMROをたどって解決し，クラスごとの表にキャッシュする
+    # ・Javaのオーバーロードに近い書き味になり，Entryの種類が増えても分岐が長くならない
+    # ・走査を共有するときのenterも，同じようにenter_File/enter_Directoryを呼び分ける
+    _dispatch_table: Dict[type, Callable[["DispatchVisitor", "Entry"], None]] = {}
+    _enter_table: Dict[type, Callable[["DispatchVisitor", "Entry", int], None]] = {}
+    _has_enter = False
+
+    def __init_subclass__(cls, **kwargs) -> None:
+        super().__init_subclass__(**kwargs)
+        cls._dispatch_table = {}  # 表はサブクラスごとに別に持つ
+        cls._enter_table = {}
+        cls._has_enter = any(name.startswith("enter_") for name in dir(cls))
+
+    # @override
+    def visit(self, entry: "Entry"):
+        try:
+            method = self._dispatch_table[type(entry)]
+        except KeyError:
+            method = self.__resolve(type(entry), "visit_", self._dispatch_table)
+        method(self, entry)
+
+    # @override
+    def enter(self, entry: "Entry", depth: int) -> None:
+        try:
+            method = self._enter_table[type(entry)]
+        except KeyError:
+            method = self.__resolve(type(entry), "enter_", self._enter_table)
+        method(self, entry, depth)
+
+    # @override
+    def supports_enter(self) -> bool:
+        return self._has_enter or type(self).enter is not DispatchVisitor.enter
+
+    @classmethod
+    def __resolve(cls, entry_type: type, prefix: str, table: dict) -> Callable:
+        for klass in entry_type.__mro__:
+            method = getattr(cls, prefix + klass.__name__, None)
+            if method is not None:
+                table[entry_type] = method
+                return method
+        raise TypeError(
+            "{} has no {} method for {}".format(
+                cls.__name__, prefix.rstrip("_"), entry_type.__name__
+            )
+        )
+
 
 # interface
 class Element(ABC):
+    __slots__ = ()
+
     @abstractmethod
     def accept(self, sv: "Visitor") -> None:
         pass
 
 
 class Entry(Element):
+    # __slots__で__dict__を持たないようにし，1ノードあたりのメモリを抑える
+    __slots__ = ()
+
     @abstractmethod
     def get_name(self) -> str:
         pass
@@ -41,6 +154,25 @@ class Entry(Element):
     def get_size(self) -> int:
         pass
 
+    def iter_paths(self, prefix: str = "") -> Iterator[Tuple[str, int]]:
+        # (パス, サイズ)を1つずつ返すジェネレータ
+        # 親のパスは段ごとに1つだけスタックに持ち，子のパスはそこから作る
+        sizes = directory_sizes(self)
+        bases = [prefix]
+        for e, depth in walk(self, PRE_ORDER):
+            path = bases[depth] + "/" + e.get_name()
+            if isinstance(e, Directory):
+                yield path, sizes[id(e)]
+                if depth + 1 < len(bases):  # 深い段の古いパスは上書きして使い回す
+                    bases[depth + 1] = path
+                else:
+                    bases.append(path)
+            else:
+                yield path, e.get_size()
+
+    def iter_lines(self, prefix: str = "") -> Iterator[str]:  # ListVisitorの各行
+        return ("{} ({})".format(path, size) for path, size in self.iter_paths(prefix))
+
     # str型との演算を定義
     def __add__(self, s: str):  # self + s の演算結果を定義 (実行されることはないが，気分でこちらも実装)
         assert isinstance(s, str)
@@ -54,6 +186,8 @@ class Entry(Element):
 
 
 class File(Entry):
+    __slots__ = ("__name", "__size")
+
     def __init__(self, name: str, size: int) -> None:
         self.__name: str = name
         self.__size: int = size
@@ -72,61 +206,721 @@ class File(Entry):
 
 
 class Directory(Entry):
+    __slots__ = ("__name", "__directory", "__children", "__index")
+
     def __init__(self, name: str) -> None:
         self.__name = name
         self.__directory: List[Entry] = []
+        # 名前→子のdictと木全体の索引．メモリを食うのでenable_indexを呼んだときだけ作る
+        self.__children: Optional[Dict[str, Entry]] = None
+        self.__index: Optional[NameIndex] = None
 
     # @override
     def get_name(self) -> str:
         return self.__name
 
     # @override
-    def get_size(self) -> int:
-        return sum(e.get_size() for e in self.__directory)
+    def get_size(self) -> int:  # 深い木でも再帰しないよう，走査エンジンでFileを集める
+        return sum(e.get_size() for e, _ in walk(self) if isinstance(e, File))
 
     # @override
     def accept(self, v: "Visitor") -> None:
         v.visit(self)
 
     def add(self, entry: Entry) -> Entry:
-        self.__directory += [entry]
+        self.__directory.append(entry)
+        if self.__index is not None:
+            self.__attach(entry)
         return self
 
-    def __iter__(self):
-        self.__cnt = 0
+    def add_many(self, entries: Iterable[Entry]) -> Entry:
+        entries = list(entries)
+        self.__directory.extend(entries)
+        if self.__index is not None:
+            for entry in entries:
+                self.__attach(entry)
         return self
 
-    def __next__(self):
-        if self.__cnt >= len(self.__directory):
-            raise StopIteration
-        result = self.__directory[self.__cnt]
-        self.__cnt += 1
+    def enable_index(self) -> "NameIndex":
+        # このDirectory以下に索引を作る．以後のaddで索引も更新される
+        # すでに(祖先の)索引に載っているなら，作り直さずにその索引を返す
+        # (作り直すと，この部分木への変更が祖先の索引に届かなくなる)
+        if self.__index is not None:
+            return self.__index
+        index = NameIndex(self)
+        self.__index = index
+        self.__children = {}
+        index.register(self)
+        for e in self:
+            self.__attach(e)
+        return index
+
+    def disable_index(self) -> None:
+        # 索引は木全体で1つなので，外せるのは索引を作ったDirectoryからだけ
+        if self.__index is None:
+            return
+        if self.__index.get_root() is not self:
+            raise ValueError(
+                "disable_index must be called on {}".format(
+                    self.__index.get_root().get_name()
+                )
+            )
+        for e, _ in walk(self):
+            if isinstance(e, Directory):
+                e.__index = None
+                e.__children = None
+
+    def __attach(self, entry: Entry) -> None:  # entryの部分木を索引に載せる
+        self.__children[entry.get_name()] = entry
+        index = self.__index
+        for e, _ in walk(entry):
+            index.register(e)
+            if isinstance(e, Directory) and e.__index is not index:
+                # 先に空のdictを置いておく．LazyDirectoryはここで読み込みが起き，
+                # そのadd_manyからも子が索引に載る(同じEntryを2回載せても結果は同じ)
+                e.__children = {}
+                e.__index = index
+                for c in e:
+                    e.__children[c.get_name()] = c
+
+    def lookup(self, path: str) -> Optional[Entry]:
+        # "/root/usr/yuki/diary.html"のようなパスで引く．索引があれば各段でdictを1回引くだけ
+        names = path.strip("/").split("/")
+        if names[0] != self.__name:
+            return None
+        entry: Entry = self
+        for name in names[1:]:
+            if not isinstance(entry, Directory):
+                return None
+            entry = entry.__child(name)
+            if entry is None:
+                return None
+        return entry
+
+    def __child(self, name: str) -> Optional[Entry]:
+        if self.__children is not None:
+            return self.__children.get(name)
+        for e in self:
+            if e.get_name() == name:
+                return e
+        return None
+
+    # 名前が一致するEntryをすべて返す
+    # 親への参照がないので，索引を使えるのは索引を作ったDirectoryから呼んだときだけ
+    def find(self, name: str) -> List[Entry]:
+        if self.__index is not None and self.__index.get_root() is self:
+            return self.__index.find(name)
+        return [e for e, _ in walk(self) if e.get_name() == name]
+
+    # "*.html"のようなパターンに合うEntryを返す
+    def glob(self, pattern: str) -> List[Entry]:
+        if self.__index is not None and self.__index.get_root() is self:
+            return self.__index.glob(pattern)
+        return [e for e, _ in walk(self) if fnmatchcase(e.get_name(), pattern)]
+
+    # pickleで部分木を子プロセスへ渡すとき，木全体を指す索引まで運ばないようにする
+    def __getstate__(self):
+        return self.__name, self.__directory
+
+    def __setstate__(self, state) -> None:
+        self.__name, self.__directory = state
+        self.__children = None
+        self.__index = None
+
+    def __iter__(self) -> Iterator[Entry]:
+        # 呼ぶたびに独立したイテレータを返す．カーソルをself側に持たないので，
+        # 同じDirectoryを入れ子で回しても，複数スレッドのVisitorが同時に回しても干渉しない
+        return iter(self.__directory)
+
+
+class NameIndex:
+    # 木全体の名前→Entryと，拡張子→Entryの索引．Directory.enable_indexで作られる
+    # 同じ名前のEntryは複数ありうるので，id()をキーにしたdictで追加順に持つ
+    def __init__(self, root: "Directory") -> None:
+        self.__root = root
+        self.__by_name: Dict[str, Dict[int, Entry]] = {}
+        self.__by_suffix: Dict[str, Dict[int, Entry]] = {}
+
+    def get_root(self) -> "Directory":
+        return self.__root
+
+    def register(self, entry: Entry) -> None:
+        name = entry.get_name()
+        self.__by_name.setdefault(name, {})[id(entry)] = entry
+        i = name.rfind(".")
+        # fnmatchcaseでは"*.html"が".html"にも合うので，先頭の"."からも拡張子として載せる
+        if i >= 0:
+            self.__by_suffix.setdefault(name[i:], {})[id(entry)] = entry
+
+    def find(self, name: str) -> List[Entry]:
+        return list(self.__by_name.get(name, {}).values())
+
+    def glob(self, pattern: str) -> List[Entry]:
+        # "*.html"だけは拡張子の索引を直接引く．それ以外は木ではなく名前の一覧をなめる
+        suffix = pattern[1:]
+        if (
+            pattern.startswith("*.")
+            and suffix.count(".") == 1
+            and not any(c in suffix for c in "*?[")
+        ):
+            return list(self.__by_suffix.get(suffix, {}).values())
+        result = []
+        for name, entries in self.__by_name.items():
+            if fnmatchcase(name, pattern):
+                result.extend(entries.values())
         return result
 
 
-class ListVisitor(Visitor):
+PRE_ORDER = "pre"
+POST_ORDER = "post"
+BREADTH_FIRST = "bfs"
+
+
+def walk(root: Entry, order: str = PRE_ORDER) -> Iterator[Tuple[Entry, int]]:
+    # 再帰を使わずに(Entry, 深さ)を順に返す走査エンジン
+    # 自前のスタック(幅優先ならキュー)を使うので，何段ネストしていてもRecursionErrorにならない
+    if order == PRE_ORDER:
+        yield root, 0
+        stack = [iter(root)] if isinstance(root, Directory) else []
+        while stack:
+            e = next(stack[-1], None)
+            if e is None:
+                stack.pop()
+                continue
+            yield e, len(stack)
+            if isinstance(e, Directory):
+                stack.append(iter(e))
+    elif order == POST_ORDER:
+        if not isinstance(root, Directory):
+            yield root, 0
+            return
+        stack = [(root, iter(root))]
+        while stack:
+            e = next(stack[-1][1], None)
+            if e is None:
+                yield stack.pop()[0], len(stack)
+            elif isinstance(e, Directory):
+                stack.append((e, iter(e)))
+            else:
+                yield e, len(stack)
+    elif order == BREADTH_FIRST:
+        queue = deque([(root, 0)])
+        while queue:
+            e, depth = queue.popleft()
+            yield e, depth
+            if isinstance(e, Directory):
+                queue.extend((c, depth + 1) for c in e)
+    else:
+        raise ValueError("unknown order: {}".format(order))
+
+
+def directory_sizes(root: Entry) -> Dict[int, int]:
+    # 後順で1回だけなめて，配下の全Directoryの合計サイズをid()をキーにまとめて求める
+    # walk(POST_ORDER)と同じ形のスタックに，途中までの合計を一緒に積んでおく
+    sizes: Dict[int, int] = {}
+    if not isinstance(root, Directory):
+        return sizes
+    stack = [[root, iter(root), 0]]
+    while stack:
+        top = stack[-1]
+        e = next(top[1], None)
+        if e is None:
+            stack.pop()
+            sizes[id(top[0])] = top[2]
+            if stack:
+                stack[-1][2] += top[2]
+        elif isinstance(e, Directory):
+            stack.append([e, iter(e), 0])
+        else:
+            top[2] += e.get_size()
+    return sizes
+
+
+def traverse(root: Entry, visitors: Sequence[Visitor]) -> None:
+    # 1回の走査で，各Entryを前順にすべてのvisitorsのenterへ渡す
+    # Directoryを抜けるときに配下の合計サイズをleaveへ渡すので，サイズのために
+    # もう1回なめる必要はない(directory_sizesと同じ形のスタックで，合計を一緒に積む)
+    check_enter(visitors)
+    enters = [v.enter for v in visitors]
+    leaves = [v.leave for v in visitors if v.uses_directory_sizes]
+    for enter in enters:
+        enter(root, 0)
+    if not isinstance(root, Directory):
+        return
+    stack = [[root, iter(root), 0]]
+    while stack:
+        top = stack[-1]
+        e = next(top[1], None)
+        if e is None:
+            stack.pop()
+            for leave in leaves:
+                leave(top[0], len(stack), top[2])
+            if stack:
+                stack[-1][2] += top[2]
+            continue
+        depth = len(stack)
+        for enter in enters:
+            enter(e, depth)
+        if isinstance(e, Directory):
+            stack.append([e, iter(e), 0])
+        elif leaves:
+            top[2] += e.get_size()
+
+
+def check_enter(visitors: Iterable[Visitor]) -> None:
+    for v in visitors:
+        if not v.supports_enter():
+            raise TypeError(
+                "{} does not implement enter and cannot share a traversal".format(
+                    type(v).__name__
+                )
+            )
+
+
+class ListVisitor(DispatchVisitor):
+    # 1行ずつprintせず，行をためておいてchunk_lines行ずつstreamへまとめて書き出す
+    # ・単独でacceptしたときは，directory_sizesでサイズを先に求めてから前順に行を作るので，
+    #   chunk_lines行たまるたびに書き出せる(ためておくのはchunk_lines行と段ごとのパスだけ)
+    # ・MultiVisitor/traverseで他のVisitorと走査を共有するときは，Directoryの行は
+    #   leaveでサイズが決まるまで書けないので，走査が終わるまで行をためる
+    uses_directory_sizes = True
+
+    def __init__(
+        self,
+        stream: Optional[TextIO] = None,
+        chunk_lines: int = 4096,
+        current_dir: str = "C:",
+    ) -> None:
+        self.__current_dir = current_dir
+        self.__stream = stream
+        self.__chunk_lines = chunk_lines
+        self.__lines: List[str] = []
+        # 段ごとのパス．深い段の古いパスは上書きして使い回す
+        self.__bases: List[str] = []
+        # サイズ待ちのDirectoryの行が__linesのどこにあるか(浅い段から順に)
+        self.__open: List[int] = []
+        self.__total = 0  # visitしたEntryの合計サイズ．joinで親の行を作るのに使う
+
+    # FileもDirectoryも同じ処理なので，MROをたどってこのメソッドが選ばれる
+    def visit_Entry(self, entry: "Entry") -> None:
+        # 配下のEntryにacceptで再帰していくと深い木でRecursionErrorになるので，
+        # 走査エンジンで前順に取り出す(iter_pathsはdirectory_sizesとwalkを使う)
+        lines = self.__lines
+        paths = entry.iter_paths(self.__current_dir)
+        path, size = next(paths)  # 最初はentry自身．joinのために合計サイズを覚えておく
+        self.__total += size
+        lines.append("{} ({})".format(path, size))
+        for path, size in paths:
+            lines.append("{} ({})".format(path, size))
+            if len(lines) >= self.__chunk_lines:
+                self.flush()
+        self.finish()
+
+    def enter_Directory(self, entry: "Directory", depth: int) -> None:
+        if depth == 0:
+            self.__bases = [self.__current_dir]
+        path = self.__bases[depth] + "/" + entry.get_name()
+        # サイズはleaveで書き足す
+        self.__open.append(len(self.__lines))
+        self.__lines.append(path)
+        if depth + 1 < len(self.__bases):
+            self.__bases[depth + 1] = path
+        else:
+            self.__bases.append(path)
+
+    def enter_File(self, entry: "File", depth: int) -> None:
+        if depth == 0:
+            self.__bases = [self.__current_dir]
+        size = entry.get_size()
+        path = self.__bases[depth] + "/" + entry.get_name()
+        self.__lines.append("{} ({})".format(path, size))
+        if depth == 0:
+            self.__total += size
+
+    # @override
+    def leave(self, directory: "Directory", depth: int, size: int) -> None:
+        i = self.__open.pop()
+        self.__lines[i] = "{} ({})".format(self.__lines[i], size)
+        if depth == 0:
+            self.__total += size
+
+    # @override
+    def finish(self) -> None:
+        self.flush()
+
+    # @override
+    def fork(self, directory: "Directory") -> "Visitor":
+        path = self.__current_dir + "/" + directory.get_name()
+        return ListVisitor(io.StringIO(), self.__chunk_lines, path)
+
+    # @override
+    def join(self, directory: "Directory", results: List["Visitor"]) -> None:
+        size = sum(v.__total for v in results)
+        self.__emit(self.__current_dir, directory, size)
+        self.flush()
+        stream = sys.stdout if self.__stream is None else self.__stream
+        for v in results:  # 子の順に書き出すので，直列に実行したときと同じ出力になる
+            stream.write(v.__stream.getvalue())
+        self.__total += size
+
+    def __emit(self, base: str, entry: "Entry", size: int) -> None:
+        self.__lines.append("{}/{} ({})".format(base, entry.get_name(), size))
+
+    def flush(self) -> None:
+        # サイズの決まった行だけを書き出す
+        end = self.__open[0] if self.__open else len(self.__lines)
+        if end == 0:
+            return
+        stream = sys.stdout if self.__stream is None else self.__stream
+        lines = self.__lines
+        step = self.__chunk_lines
+        for i in range(0, end, step):
+            stop = min(i + step, end)
+            chunk = lines[i:stop]
+            chunk.append("")
+            stream.write("\n".join(chunk))
+        del lines[:end]
+        self.__open = [i - end for i in self.__open]
+
+
+class SizeVisitor(DispatchVisitor):
+    # File数，Directory数，合計サイズを数える統計用のVisitor
     def __init__(self) -> None:
-        self.__current_dir = "C:"
+        self.__files = 0
+        self.__directories = 0
+        self.__total = 0
+
+    def visit_Entry(self, entry: "Entry") -> None:
+        traverse(entry, [self])
+
+    def enter_File(self, entry: "File", depth: int) -> None:
+        self.__files += 1
+        self.__total += entry.get_size()
+
+    def enter_Directory(self, entry: "Directory", depth: int) -> None:
+        self.__directories += 1
+
+    # @override
+    def fork(self, directory: "Directory") -> "Visitor":
+        return SizeVisitor()
+
+    # @override
+    def join(self, directory: "Directory", results: List["Visitor"]) -> None:
+        self.__directories += 1
+        for v in results:
+            self.__files += v.__files
+            self.__directories += v.__directories
+            self.__total += v.__total
+
+    def get_file_count(self) -> int:
+        return self.__files
+
+    def get_directory_count(self) -> int:
+        return self.__directories
+
+    def get_total_size(self) -> int:
+        return self.__total
+
+
+class FileFindVisitor(DispatchVisitor):
+    # 名前が指定した拡張子で終わるFileを，見つかった順に集めるVisitor
+    def __init__(self, suffix: str) -> None:
+        self.__suffix = suffix
+        self.__found: List[File] = []
+
+    def visit_Entry(self, entry: "Entry") -> None:
+        traverse(entry, [self])
+
+    def enter_File(self, entry: "File", depth: int) -> None:
+        if entry.get_name().endswith(self.__suffix):
+            self.__found.append(entry)
+
+    def enter_Directory(self, entry: "Directory", depth: int) -> None:
+        pass
+
+    # @override
+    def fork(self, directory: "Directory") -> "Visitor":
+        return FileFindVisitor(self.__suffix)
+
+    # @override
+    def join(self, directory: "Directory", results: List["Visitor"]) -> None:
+        for v in results:
+            self.__found.extend(v.__found)
+
+    def get_found_files(self) -> List[File]:
+        return self.__found
+
+
+class MultiVisitor(Visitor):
+    # 複数のVisitorを1回の走査でまとめて動かす．k個のVisitorでも木をなめるのは1回で済む
+    # 渡せるのはenterを持つVisitorだけ(Visitorのコメントを参照)
+    def __init__(self, *visitors: Visitor) -> None:
+        check_enter(visitors)
+        self.__visitors = list(visitors)
+        self.__leaving = [v for v in visitors if v.uses_directory_sizes]
+        self.uses_directory_sizes = bool(self.__leaving)
 
     # @override
     def visit(self, entry: "Entry"):
-        if isinstance(entry, File):
-            file: File = entry  # 変数名を変えたいだけ
+        traverse(entry, self.__visitors)
+        self.finish()
 
-            print(self.__current_dir + "/" + file)
-        elif isinstance(entry, Directory):
-            directory: Directory = entry  # 変数名を変えたいだけ
-
-            print(self.__current_dir + "/" + directory)
-            # 今いるディレクトリのパスをcurrentdirに記憶した状態で
-            # 次のEntryをvisitしないといけないのでこうなる(ここはちょっとロジックが難しい)
-            savedir = self.__current_dir
-            self.__current_dir = self.__current_dir + "/" + directory.get_name()
-            for e in directory:
-                e.accept(self)
-            self.__current_dir = savedir
+    # @override
+    def enter(self, entry: "Entry", depth: int) -> None:
+        for v in self.__visitors:
+            v.enter(entry, depth)
+
+    # @override
+    def leave(self, directory: "Directory", depth: int, size: int) -> None:
+        for v in self.__leaving:
+            v.leave(directory, depth, size)
+
+    # @override
+    def finish(self) -> None:
+        for v in self.__visitors:
+            v.finish()
+
+    # @override
+    def fork(self, directory: "Directory") -> "Visitor":
+        return MultiVisitor(*(v.fork(directory) for v in self.__visitors))
+
+    # @override
+    def join(self, directory: "Directory", results: List["Visitor"]) -> None:
+        for i, v in enumerate(self.__visitors):
+            v.join(directory, [r.__visitors[i] for r in results])
+
+    # @override
+    def supports_fork(self) -> bool:
+        return all(v.supports_fork() for v in self.__visitors)
+
+    def get_visitors(self) -> List[Visitor]:
+        return self.__visitors
+
+
+def _accept(entries: List[Entry], visitor: Visitor) -> Visitor:
+    # プロセスプールに渡せるよう，モジュールのトップレベルに置く
+    for entry in entries:
+        entry.accept(visitor)
+    return visitor
+
+
+class ParallelVisitorExecutor:
+    # Directoryを部分木に分け，部分木ごとにforkしたVisitorをプール上で並列に走らせる
+    # ・split_depth段目までのDirectoryで分割する
+    # ・隣り合った子(Fileも含む)はまとめて1つのタスクにし，タスク数を
+    #   max_workers * tasks_per_worker 程度に抑える．子1つごとに投げるとpickleと
+    #   タスクの受け渡しのコストが部分木の処理より大きくなる
+    # ・結果は完了順ではなく子の順にjoinするので，実行するたびに同じ結果になる
+    # ・CPUを使い切りたいならProcessPoolExecutor(部分木とVisitorはpickleで渡る)
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        executor_class: Type[Executor] = ProcessPoolExecutor,
+        split_depth: int = 1,
+        tasks_per_worker: int = 4,
+    ) -> None:
+        if split_depth < 1:
+            raise ValueError("split_depth must be >= 1: {}".format(split_depth))
+        if tasks_per_worker < 1:
+            raise ValueError(
+                "tasks_per_worker must be >= 1: {}".format(tasks_per_worker)
+            )
+        self.__max_workers = max_workers
+        self.__executor_class = executor_class
+        self.__split_depth = split_depth
+        self.__tasks = (max_workers or os.cpu_count() or 1) * tasks_per_worker
+
+    def run(self, entry: Entry, visitor: Visitor) -> Visitor:
+        # プールを立ち上げる前に，forkとjoinがあるVisitorかを確かめる
+        if not visitor.supports_fork():
+            raise TypeError(
+                "{} does not implement fork/join".format(type(visitor).__name__)
+            )
+        if not isinstance(entry, Directory):
+            entry.accept(visitor)
+            return visitor
+        with self.__executor_class(max_workers=self.__max_workers) as pool:
+            plan = self.__split(pool, entry, visitor, self.__split_depth, self.__tasks)
+            return self.__merge(plan)
+
+    def __split(
+        self,
+        pool: Executor,
+        directory: "Directory",
+        visitor: Visitor,
+        depth: int,
+        tasks: int,
+    ) -> tuple:
+        # tasksはこのdirectoryに割り当てるタスク数の目安
+        # さらに分割する子Directoryとそれ以外の子の塊とで等分する
+        children = list(directory)
+        nested = [depth > 1 and isinstance(c, Directory) for c in children]
+        share = max(1, tasks // (sum(nested) + 1))
+        per_task = -(-len(children) // share)  # 切り上げ
+        parts: list = []
+        chunk: List[Entry] = []
+        for child, split in zip(children, nested):
+            if split:
+                if chunk:
+                    parts.append(pool.submit(_accept, chunk, visitor.fork(directory)))
+                    chunk = []
+                forked = visitor.fork(directory)
+                parts.append(self.__split(pool, child, forked, depth - 1, share))
+                continue
+            chunk.append(child)
+            if len(chunk) >= per_task:
+                parts.append(pool.submit(_accept, chunk, visitor.fork(directory)))
+                chunk = []
+        if chunk:
+            parts.append(pool.submit(_accept, chunk, visitor.fork(directory)))
+        return directory, visitor, parts
+
+    def __merge(self, plan: tuple) -> Visitor:
+        directory, visitor, parts = plan
+        results = [
+            p.result() if isinstance(p, Future) else self.__merge(p) for p in parts
+        ]
+        visitor.join(directory, results)
+        return visitor
+
+
+def _scan(path: str) -> List[Tuple[str, bool, int]]:
+    # os.scandirで1段だけ読み，(名前, ディレクトリか, サイズ)を名前順に返す
+    # 読めないものは飛ばす(権限がない，途中で消えた，など)
+    result = []
+    try:
+        with os.scandir(path) as it:
+            for e in it:
+                try:
+                    if e.is_dir(follow_symlinks=False):
+                        result.append((e.name, True, 0))
+                    else:
+                        size = e.stat(follow_symlinks=False).st_size
+                        result.append((e.name, False, size))
+                except OSError:
+                    continue
+    except OSError:
+        pass
+    result.sort()
+    return result
+
+
+def _fill(
+    directory: Directory, path: str, scanned: List[Tuple[str, bool, int]], lazy: bool
+) -> List[Tuple[Directory, str]]:
+    # _scanの結果からdirectoryの子を作る．中身をまだ読んでいない子Directoryを返す
+    children: List[Entry] = []
+    pending = []
+    for name, is_dir, size in scanned:
+        if is_dir:
+            sub_path = os.path.join(path, name)
+            d = LazyDirectory(name, sub_path) if lazy else Directory(name)
+            children.append(d)
+            pending.append((d, sub_path))
         else:
-            assert False
+            children.append(File(name, size))
+    Directory.add_many(directory, children)  # LazyDirectory.add_manyだと読み込みが走る
+    return pending
+
+
+def _load_parallel(
+    frontier: List[Tuple[Directory, str]], max_workers: Optional[int]
+) -> None:
+    # 同じ段のディレクトリをスレッドプールで並列にscandirし，1段ずつ下へ進む
+    # scandirやstatはI/Oの間GILを手放すので，スレッドでも並列に読める
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        while frontier:
+            scanned = pool.map(_scan, [path for _, path in frontier])
+            next_frontier = []
+            for (d, path), entries in zip(frontier, scanned):
+                next_frontier.extend(_fill(d, path, entries, lazy=False))
+            frontier = next_frontier
+
+
+def load_tree(
+    path: str, max_workers: Optional[int] = None, lazy: bool = False
+) -> Directory:
+    # 実際のディレクトリからFile/Directoryの木を作る
+    # lazy=Trueなら，各ディレクトリは最初に子へアクセスしたときに初めて読まれる
+    name = os.path.basename(os.path.normpath(path)) or path
+    if lazy:
+        return LazyDirectory(name, path)
+    root = Directory(name)
+    _load_parallel([(root, path)], max_workers)
+    return root
+
+
+class LazyDirectory(Directory):
+    # 最初に子へアクセスしたときに初めて1段だけscandirするDirectory
+    # get_sizeは配下全体を読まないと決まらないので，部分木をまとめて並列に読んでから数える
+    __slots__ = ("__path", "__loaded", "__complete")
+
+    def __init__(self, name: str, path: str) -> None:
+        super().__init__(name)
+        self.__path = path
+        self.__loaded = False  # 自分の直下を読んだか
+        self.__complete = False  # 配下をすべて読んだか
+
+    # @override
+    def get_size(self) -> int:
+        self.load_all()
+        return super().get_size()
+
+    def add(self, entry: Entry) -> Entry:
+        self.__load()
+        return super().add(entry)
+
+    def add_many(self, entries: Iterable[Entry]) -> Entry:
+        self.__load()
+        return super().add_many(entries)
+
+    def enable_index(self) -> "NameIndex":  # 索引には全部の名前が要るので先に全部読む
+        self.load_all()
+        return super().enable_index()
+
+    def __iter__(self) -> Iterator[Entry]:
+        self.__load()
+        return super().__iter__()
+
+    def __load(self) -> None:
+        if not self.__loaded:
+            self.__loaded = True
+            _fill(self, self.__path, _scan(self.__path), lazy=True)
+
+    def load_all(self, max_workers: Optional[int] = None) -> None:
+        # まだ読んでいないLazyDirectoryを(読み込みを起こさずに)集めて，まとめて並列に読む
+        if self.__complete:
+            return
+        frontier = []
+        lazies = []
+        stack: List[Directory] = [self]
+        while stack:
+            d = stack.pop()
+            if isinstance(d, LazyDirectory):
+                if d.__complete:
+                    continue
+                lazies.append(d)
+                if not d.__loaded:
+                    d.__loaded = True
+                    frontier.append((d, d.__path))
+                    continue
+            children = Directory.__iter__(d)
+            stack.extend(c for c in children if isinstance(c, Directory))
+        if frontier:
+            _load_parallel(frontier, max_workers)
+        for d in lazies:
+            d.__complete = True
+
+    # pickleで子プロセスへ渡すときは，読み込み済みの木として渡す
+    def __getstate__(self):
+        self.load_all()
+        return super().__getstate__(), self.__path
+
+    def __setstate__(self, state) -> None:
+        base, self.__path = state
+        super().__setstate__(base)
+        self.__loaded = True
+        self.__complete = True
 
 
 class Main:
@@ -159,4 +953,6 @@ class Main:
         rootdir.accept(ListVisitor())
 
 
-Main()
+# ProcessPoolExecutorの子プロセスでimportされたときは実行しない
+if __name__ == "__main__":
+    Main()
@@ -1,4 +1,7 @@
 from abc import ABC, abstractmethod
+from array import array
+from itertools import accumulate, islice, repeat
+import mmap
 import random
 
 
@@ -100,6 +103,104 @@ class FileDisplayImpl(DisplayImpl):
         print("+{}+".format("-" * self.__maxlen))
 
 
+class MappedFileDisplayImpl(DisplayImpl):
+    # FileDisplayImplと同じ表示を，ファイルを何度も読み直さずに行う
+    # ファイルはmmapで開いたままにし，最初に1回だけ頭から読んで各行の先頭位置と最大幅を数える
+    # 表示のときは位置の表を使ってchunk_lines行ずつ切り出すので，大きなファイルでもメモリは増えない
+    # (行の区切りは"\n"だけを見る．幅はFileDisplayImplと同じく文字数で数える)
+    # ファイルはバイナリのまま読むので，改行の変換はしない．FileDisplayImplはテキストモードで
+    # 開くので"\r\n"を"\n"に直すが，こちらは各行の末尾に"\r"が残り，幅も1文字ずつ多く数える
+    # 使い終わったらcloseを呼ぶか，with文で使ってmmapを閉じる
+    def __init__(
+        self,
+        filename: str,
+        encoding: str = "utf-8",
+        chunk_lines: int = 4096,
+        chunk_bytes: int = 1 << 20,
+    ) -> None:
+        assert chunk_lines > 0 and chunk_bytes > 0
+        self.__encoding = encoding
+        self.__chunk_lines = chunk_lines
+        with open(filename, "rb") as f:
+            # 空のファイルはmmapできないので，空のbytesで代わりにする
+            if f.seek(0, 2) == 0:
+                self.__data = b""
+            else:
+                self.__data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.__offsets, self.__maxlen = self.__index(chunk_bytes)
+
+    def close(self) -> None:
+        if isinstance(self.__data, mmap.mmap):
+            self.__data.close()
+
+    def __enter__(self) -> "MappedFileDisplayImpl":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def __index(self, chunk_bytes: int):
+        # i行目はdata[offsets[i]:offsets[i + 1] - 1] (-1は改行の分)
+        # 最後の行にも改行がある体で数えるので，offsets[-1]はlen(data) + 1
+        # 改行の直後で区切ったchunk_bytes程度の塊ごとにsplitするので，行ごとのPythonの処理はない
+        data = self.__data
+        size = len(data)
+        offsets = array("q", [0])
+        maxlen = 0
+        start = 0
+        while True:
+            end = (
+                data.find(b"\n", start + chunk_bytes)
+                if start + chunk_bytes < size
+                else -1
+            )
+            if end == -1:
+                end = size
+            chunk = data[start:end]
+            lines = chunk.split(b"\n")
+            # accumulateの最初の値(start)は前の塊の最後の値として，もう入っている
+            ends = accumulate(map((1).__add__, map(len, lines)), initial=start)
+            offsets.extend(islice(ends, 1, None))
+            if chunk.isascii():
+                maxlen = max(maxlen, max(map(len, lines)))
+            else:
+                maxlen = max(
+                    maxlen, max(map(len, chunk.decode(self.__encoding).split("\n")))
+                )
+            if end == size:
+                return offsets, maxlen
+            start = end + 1
+
+    # @override
+    def raw_open(self):
+        self.print_line()
+
+    # @override
+    def raw_print(self):
+        for lines in self.iter_chunks():
+            print("\n".join(lines))
+
+    # @override
+    def raw_close(self):
+        self.print_line()
+
+    def print_line(self):
+        print("+{}+".format("-" * self.__maxlen))
+
+    def iter_chunks(self):
+        # raw_printで出す行を，chunk_lines行ずつのリストで返す
+        data = self.__data
+        offsets = self.__offsets
+        n = len(offsets) - 1
+        for i in range(0, n, self.__chunk_lines):
+            j = min(i + self.__chunk_lines, n)
+            lo = offsets[i]
+            hi = offsets[j] - 1
+            text = data[lo:hi].decode(self.__encoding)
+            padded = map(str.ljust, text.split("\n"), repeat(self.__maxlen))
+            yield list(map("|{}|".format, padded))
+
+
 class Main:
     def __init__(self) -> None:  # Javaのmain関数を模して，これをmainとする
         # d1: Display = Display(StringDisplayImpl("Hello, Japan."))
@@ -115,4 +216,5 @@ class Main:
         d4.multi_display(10)
 
 
-Main()
+if __name__ == "__main__":
+    Main()
@@ -0,0 +1,51 @@
+"""
+CountDisplay.multi_display(10**6)を，1行ずつprintする以前の方法と，
+中身の行を1回だけ作って塊でwriteする今の方法とで比べるベンチマーク
+chap_9のディレクトリで python bench_multi_display.py として実行する
+"""
+
+import contextlib
+import io
+import os
+import time
+
+from bridge import CountDisplay, DisplayImpl, StringDisplayImpl
+
+
+class PrintEachImpl(StringDisplayImpl):
+    # 比較用: DisplayImplの既定どおり，raw_printをtimes回呼ぶ
+    # @override
+    def raw_print_many(self, times: int):
+        DisplayImpl.raw_print_many(self, times)
+
+
+def measure(impl, times: int, stream) -> float:
+    with contextlib.redirect_stdout(stream):
+        start = time.perf_counter()
+        CountDisplay(impl).multi_display(times)
+        return time.perf_counter() - start
+
+
+def main(times: int = 10**6) -> None:
+    string = "Hello, Universe."
+    old = io.StringIO()
+    new = io.StringIO()
+    measure(PrintEachImpl(string), 1000, old)
+    measure(StringDisplayImpl(string), 1000, new)
+    assert old.getvalue() == new.getvalue()
+    for label, impl in (
+        ("print each", PrintEachImpl(string)),
+        ("chunked write", StringDisplayImpl(string)),
+    ):
+        with open(os.devnull, "w") as devnull:
+            to_null = measure(impl, times, devnull)
+        to_memory = measure(impl, times, io.StringIO())
+        print(
+            "{:<14} times={:,}  /dev/null {:6.3f} s  StringIO {:6.3f} s".format(
+                label, times, to_null, to_memory
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -15,6 +15,14 @@ Bridgeパターン
 
 
 from abc import ABC, abstractmethod
+from array import array
+import asyncio
+from itertools import accumulate, islice, repeat
+import mmap
+import os
+import struct
+import sys
+from typing import Iterator, List, Optional, Tuple
 
 
 class Display:
@@ -27,9 +35,28 @@ class Display:
     def print(self) -> None:
         self.__impl.raw_print()
 
+    def print_many(self, times: int) -> None:
+        self.__impl.raw_print_many(times)
+
     def close(self) -> None:
         self.__impl.raw_close()
 
+    # 出力する代わりに，その1行を文字列で返す版
+    def open_text(self) -> str:
+        return self.__impl.open_text()
+
+    def print_text(self) -> str:
+        return self.__impl.print_text()
+
+    def close_text(self) -> str:
+        return self.__impl.close_text()
+
+    def get_body_rows(self) -> int:
+        return self.__impl.get_body_rows()
+
+    def iter_body(self, start: int, stop: int) -> Iterator[str]:
+        return self.__impl.iter_body(start, stop)
+
     def display(self):
         self.open()
         self.print()
@@ -42,10 +69,39 @@ class CountDisplay(Display):
 
     def multi_display(self, times: int):
         self.open()
-        for _ in range(times):
-            self.print()
+        self.print_many(times)
         self.close()
 
+    def render_rows(
+        self, times: int, start: int = 0, stop: Optional[int] = None
+    ) -> Iterator[str]:
+        # multi_display(times)が出す行のうち，start行目からstop行目の手前までだけを作る
+        # 0行目がopen，続くtimes * k行がprint(1回分がk行)，最後の行がclose
+        # printの行は，範囲に入る部分だけを1回分ずつiter_bodyで作らせる
+        k = self.get_body_rows()
+        rows = 1 + times * k + 1
+        if stop is None or stop > rows:
+            stop = rows
+        start = max(start, 0)
+        if start >= stop:
+            return
+        if start == 0:
+            yield self.open_text()
+        lo = max(start, 1) - 1  # printの行だけを数えた位置
+        hi = min(stop, rows - 1) - 1
+        if k == 1 and lo < hi:  # 1行なら1回だけ作って使い回す
+            body = next(self.iter_body(0, 1))
+            for _ in range(lo, hi):
+                yield body
+        else:
+            while lo < hi:
+                line = lo % k
+                n = min(hi - lo, k - line)
+                yield from self.iter_body(line, line + n)
+                lo += n
+        if stop == rows:
+            yield self.close_text()
+
 
 class DisplayImpl(ABC):
     @abstractmethod
@@ -60,6 +116,35 @@ class DisplayImpl(ABC):
     def raw_close(self):
         pass
 
+    def raw_print_many(self, times: int):
+        # raw_printをtimes回行う．同じものを何度も出すのを速くできる実装は上書きする
+        for _ in range(times):
+            self.raw_print()
+
+    # 以下はCountDisplay.render_rowsのために，出力する代わりにその行を文字列で返す版
+    # render_rowsを使わない実装は上書きしなくてよい(呼ばれたらTypeErrorになる)
+    def open_text(self) -> str:
+        raise self.__unsupported()
+
+    def print_text(self) -> str:
+        raise self.__unsupported()
+
+    def close_text(self) -> str:
+        raise self.__unsupported()
+
+    # print 1回分の行数と，そのうちstart行目からstop行目の手前まで
+    # 既定ではprint_textを1行として扱う．複数行を出す実装は両方を上書きする
+    def get_body_rows(self) -> int:
+        return 1
+
+    def iter_body(self, start: int, stop: int) -> Iterator[str]:
+        return iter([self.print_text()][start:stop])
+
+    def __unsupported(self) -> TypeError:
+        return TypeError(
+            "{} does not implement the *_text methods".format(type(self).__name__)
+        )
+
 
 class StringDisplayImpl(DisplayImpl):
     def __init__(self, string) -> None:
@@ -71,14 +156,346 @@ class StringDisplayImpl(DisplayImpl):
 
     # @override
     def raw_print(self):
-        print("|{}|".format(self.__string))
+        print(self.print_text())
+
+    # @override
+    def raw_close(self):
+        self.print_line()
+
+    # @override
+    def raw_print_many(self, times: int, chunk_bytes: int = 1 << 16):
+        # 中身の行は1回だけ作り，それを繰り返した塊をまとめてwriteする
+        write = sys.stdout.write
+        for chunk in _repeat_chunks(self.print_text() + "\n", times, chunk_bytes):
+            write(chunk)
+
+    # @override
+    def open_text(self) -> str:
+        return self.line_text()
+
+    # @override
+    def print_text(self) -> str:
+        return "|{}|".format(self.__string)
+
+    # @override
+    def close_text(self) -> str:
+        return self.line_text()
+
+    def print_line(self):
+        print(self.line_text())
+
+    def line_text(self) -> str:
+        return "+{}+".format("-" * len(self.__string))
+
+
+def _repeat_chunks(line: str, times: int, chunk_bytes: int) -> Iterator[str]:
+    # lineをtimes回つなげたものを，chunk_bytes程度の塊に分けて返す
+    # 塊より多い分は同じ塊を使い回すので，timesがいくら大きくてもメモリは塊1つ分で済む
+    if times <= 0:
+        return
+    per_chunk = max(1, min(times, chunk_bytes // len(line)))
+    chunk = line * per_chunk
+    full, rest = divmod(times, per_chunk)
+    for _ in range(full):
+        yield chunk
+    if rest:
+        yield line * rest
+
+
+class IndexedFileDisplayImpl(DisplayImpl):
+    # ファイルの各行を，最大幅に揃えて枠で挟んで表示する
+    # 各行の先頭位置の表と最大幅は，ファイルの隣の小さなキャッシュ(既定では<ファイル名>.idx)に保存しておき，
+    # パス・サイズ・更新時刻が同じなら次からはファイル全体を読まずにそれを使う
+    # ファイルはmmapで開いたままにし，行は位置の表を使って切り出すので，
+    # 複数のDisplayから同時に別々の範囲を読んでもよい
+    # (行の区切りは"\n"だけを見る．幅は文字数で数える)
+    __MAGIC = b"LINEIDX1"
+    # magic, サイズ, 更新時刻(ns), 最大幅, 行数, パスの長さ．この後ろにパスと位置の表が続く
+    __HEADER = struct.Struct("<8sqqqqq")
+
+    def __init__(
+        self,
+        filename: str,
+        encoding: str = "utf-8",
+        cache_path: Optional[str] = None,
+        chunk_lines: int = 4096,
+    ) -> None:
+        assert chunk_lines > 0
+        self.__path = os.path.abspath(filename)
+        self.__encoding = encoding
+        self.__chunk_lines = chunk_lines
+        with open(self.__path, "rb") as f:
+            st = os.fstat(f.fileno())
+            # 空のファイルはmmapできないので，空のbytesで代わりにする
+            if st.st_size == 0:
+                self.__data = b""
+            else:
+                self.__data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        key = (self.__path, st.st_size, st.st_mtime_ns)
+        if cache_path is None:
+            cache_path = self.__path + ".idx"
+        index = self.__load_index(cache_path, key)
+        if index is None:
+            index = self.__scan()
+            self.__save_index(cache_path, key, index)
+        self.__offsets, self.__maxlen = index
+
+    def close(self) -> None:
+        if isinstance(self.__data, mmap.mmap):
+            self.__data.close()
+
+    def get_line_count(self) -> int:
+        return len(self.__offsets) - 1
+
+    def get_max_width(self) -> int:
+        return self.__maxlen
+
+    def read_lines(self, start: int = 0, stop: Optional[int] = None) -> List[str]:
+        # start行目からstop行目の手前までを，幅を揃えて枠で挟んだ文字列のリストで返す
+        n = self.get_line_count()
+        if stop is None or stop > n:
+            stop = n
+        start = max(start, 0)
+        if start >= stop:
+            return []
+        lo = self.__offsets[start]
+        hi = self.__offsets[stop] - 1
+        text = self.__data[lo:hi].decode(self.__encoding)
+        padded = map(str.ljust, text.split("\n"), repeat(self.__maxlen))
+        return list(map("|{}|".format, padded))
+
+    def iter_lines(self, start: int = 0, stop: Optional[int] = None) -> Iterator[str]:
+        # read_linesと同じ行を，chunk_lines行ずつ読みながら返す
+        n = self.get_line_count()
+        if stop is None or stop > n:
+            stop = n
+        for i in range(max(start, 0), stop, self.__chunk_lines):
+            yield from self.read_lines(i, min(i + self.__chunk_lines, stop))
+
+    # @override
+    def raw_open(self):
+        self.print_line()
+
+    # @override
+    def raw_print(self):
+        for i in range(0, self.get_line_count(), self.__chunk_lines):
+            print("\n".join(self.read_lines(i, i + self.__chunk_lines)))
 
     # @override
     def raw_close(self):
         self.print_line()
 
+    # @override
+    def open_text(self) -> str:
+        return self.line_text()
+
+    # ファイル全体を1つの文字列にするので，大きなファイルでは使わない
+    # (render_rowsは，範囲に入る行だけをiter_bodyで読む)
+    # @override
+    def print_text(self) -> str:
+        return "\n".join(self.iter_lines())
+
+    # @override
+    def close_text(self) -> str:
+        return self.line_text()
+
+    # @override
+    def get_body_rows(self) -> int:
+        return self.get_line_count()
+
+    # @override
+    def iter_body(self, start: int, stop: int) -> Iterator[str]:
+        return self.iter_lines(start, stop)
+
     def print_line(self):
-        print("+{}+".format("-" * len(self.__string)))
+        print(self.line_text())
+
+    def line_text(self) -> str:
+        return "+{}+".format("-" * self.__maxlen)
+
+    def __scan(self, chunk_bytes: int = 1 << 20) -> Tuple[array, int]:
+        # ファイルを頭から1回だけ読み，各行の先頭位置と最大幅を数える
+        # i行目は[offsets[i], offsets[i + 1] - 1)の範囲 (-1は改行の分)
+        # 最後の行にも改行がある体で数えるので，offsets[-1]はファイルサイズ + 1
+        offsets = array("q", [0])
+        maxlen = 0
+        pos = 0
+        rest = b""
+        while True:
+            end = pos + chunk_bytes
+            block = self.__data[pos:end]
+            pos += len(block)
+            data = rest + block
+            if block:
+                # 最後の改行までを処理し，残りは次の塊とつなげる
+                cut = data.rfind(b"\n")
+                if cut == -1:
+                    rest = data
+                    continue
+                chunk = data[:cut]
+                cut += 1
+                rest = data[cut:]
+            else:
+                chunk = data
+            lines = chunk.split(b"\n")
+            # accumulateの最初の値は前の塊の最後の値として，もう入っている
+            ends = accumulate(map((1).__add__, map(len, lines)), initial=offsets[-1])
+            offsets.extend(islice(ends, 1, None))
+            if chunk.isascii():
+                maxlen = max(maxlen, max(map(len, lines)))
+            else:
+                text = chunk.decode(self.__encoding)
+                maxlen = max(maxlen, max(map(len, text.split("\n"))))
+            if not block:
+                return offsets, maxlen
+
+    def __load_index(
+        self, cache_path: str, key: Tuple[str, int, int]
+    ) -> Optional[Tuple[array, int]]:
+        # キャッシュが読めない，壊れている，キーが違う，のどれでもNoneを返して読み直させる
+        try:
+            with open(cache_path, "rb") as f:
+                header = f.read(self.__HEADER.size)
+                magic, size, mtime_ns, maxlen, count, path_len = self.__HEADER.unpack(
+                    header
+                )
+                path = f.read(path_len).decode("utf-8")
+                if magic != self.__MAGIC or (path, size, mtime_ns) != key:
+                    return None
+                offsets = array("q")
+                offsets.fromfile(f, count + 1)
+        except (OSError, EOFError, struct.error, UnicodeDecodeError):
+            return None
+        return offsets, maxlen
+
+    def __save_index(
+        self, cache_path: str, key: Tuple[str, int, int], index: Tuple[array, int]
+    ) -> None:
+        # 書きかけのキャッシュを読まれないよう，別名で書いてから置き換える
+        # 書けない場所や，同じ名前で別のファイルがある場所なら保存せずに済ませる
+        # (次もまた読み直すだけ)
+        if not self.__replaceable(cache_path):
+            return
+        path, size, mtime_ns = key
+        offsets, maxlen = index
+        encoded = path.encode("utf-8")
+        tmp = "{}.{}.tmp".format(cache_path, os.getpid())
+        try:
+            with open(tmp, "wb") as f:
+                f.write(
+                    self.__HEADER.pack(
+                        self.__MAGIC,
+                        size,
+                        mtime_ns,
+                        maxlen,
+                        len(offsets) - 1,
+                        len(encoded),
+                    )
+                )
+                f.write(encoded)
+                offsets.tofile(f)
+            os.replace(tmp, cache_path)
+        except OSError:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+
+    def __replaceable(self, cache_path: str) -> bool:
+        # まだないか，先頭がmagicの(=このクラスが書いた)ファイルなら上書きしてよい
+        try:
+            with open(cache_path, "rb") as f:
+                return f.read(len(self.__MAGIC)) == self.__MAGIC
+        except FileNotFoundError:
+            return True
+        except OSError:
+            return False
+
+
+class AsyncDisplay:
+    # Displayの非同期版．実装側(AsyncDisplayImpl)の書き込みを待つ間，
+    # イベントループは他の接続の表示を進められる
+    def __init__(self, impl: "AsyncDisplayImpl") -> None:
+        self.__impl: "AsyncDisplayImpl" = impl
+
+    async def open(self) -> None:
+        await self.__impl.raw_open()
+
+    async def print(self) -> None:
+        await self.__impl.raw_print()
+
+    async def print_many(self, times: int) -> None:
+        await self.__impl.raw_print_many(times)
+
+    async def close(self) -> None:
+        await self.__impl.raw_close()
+
+    async def display(self):
+        await self.open()
+        await self.print()
+        await self.close()
+
+
+class AsyncCountDisplay(AsyncDisplay):
+    def __init__(self, impl: "AsyncDisplayImpl") -> None:
+        super().__init__(impl)
+
+    async def multi_display(self, times: int):
+        await self.open()
+        await self.print_many(times)
+        await self.close()
+
+
+class AsyncDisplayImpl(ABC):
+    @abstractmethod
+    async def raw_open(self):
+        pass
+
+    @abstractmethod
+    async def raw_print(self):
+        pass
+
+    @abstractmethod
+    async def raw_close(self):
+        pass
+
+    async def raw_print_many(self, times: int):
+        for _ in range(times):
+            await self.raw_print()
+
+
+class AsyncStringDisplayImpl(AsyncDisplayImpl):
+    # StringDisplayImplと同じ表示を，asyncio.StreamWriterへ書く
+    # 書くたびにdrainを待つので，相手の読みが遅ければここで待たされる(送信バッファは溜まり続けない)
+    def __init__(self, string, writer: asyncio.StreamWriter) -> None:
+        self.__string = string
+        self.__writer = writer
+
+    # @override
+    async def raw_open(self):
+        await self.print_line()
+
+    # @override
+    async def raw_print(self):
+        await self.__write("|{}|\n".format(self.__string))
+
+    # @override
+    async def raw_close(self):
+        await self.print_line()
+
+    # @override
+    async def raw_print_many(self, times: int, chunk_bytes: int = 1 << 16):
+        # StringDisplayImpl.raw_print_manyと同じく，中身の行を繰り返した塊を使い回して書く
+        line = "|{}|\n".format(self.__string)
+        for chunk in _repeat_chunks(line, times, chunk_bytes):
+            await self.__write(chunk)
+
+    async def print_line(self):
+        await self.__write("+{}+\n".format("-" * len(self.__string)))
+
+    async def __write(self, text: str):
+        self.__writer.write(text.encode("utf-8"))
+        await self.__writer.drain()
 
 
 class Main:
@@ -93,4 +510,5 @@ class Main:
         d3.multi_display(5)
 
 
-Main()
+if __name__ == "__main__":
+    Main()
@@ -0,0 +1,49 @@
+"""
+A2.pyの確認用のテスト(python -m unittest で実行する)
+"""
+
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+
+from A2 import CountDisplay, FileDisplayImpl, MappedFileDisplayImpl
+
+
+def shown(impl) -> str:
+    s = io.StringIO()
+    with contextlib.redirect_stdout(s):
+        CountDisplay(impl).multi_display(2)
+    return s.getvalue()
+
+
+class MappedFileDisplayImplTest(unittest.TestCase):
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp()
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write("first\nいろは\n\nlast line")
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def test_same_output_as_file_impl(self):
+        with MappedFileDisplayImpl(self.path, chunk_lines=2, chunk_bytes=4) as impl:
+            self.assertEqual(shown(impl), shown(FileDisplayImpl(self.path)))
+
+    def test_close(self):
+        impl = MappedFileDisplayImpl(self.path)
+        impl.close()
+        impl.close()  # 2回呼んでもよい
+        with self.assertRaises(ValueError):  # 閉じたmmapは読めない
+            shown(impl)
+
+    def test_empty_file(self):
+        with open(self.path, "w"):
+            pass
+        with MappedFileDisplayImpl(self.path) as impl:
+            self.assertEqual(shown(impl), "++\n||\n||\n++\n")
+
+
+if __name__ == "__main__":
+    unittest.main()
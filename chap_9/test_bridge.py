@@ -0,0 +1,154 @@
+"""
+bridge.pyの確認用のテスト(python -m unittest で実行する)
+"""
+
+import asyncio
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+
+from bridge import (
+    AsyncCountDisplay,
+    AsyncDisplay,
+    AsyncStringDisplayImpl,
+    CountDisplay,
+    Display,
+    DisplayImpl,
+    IndexedFileDisplayImpl,
+    StringDisplayImpl,
+)
+
+
+class PrintOnlyImpl(DisplayImpl):  # raw_*だけを実装した，以前からある形の実装
+    def raw_open(self):
+        print("open")
+
+    def raw_print(self):
+        print("print")
+
+    def raw_close(self):
+        print("close")
+
+
+class RenderRowsTest(unittest.TestCase):
+    def test_string_impl(self):
+        d = CountDisplay(StringDisplayImpl("ab"))
+        s = io.StringIO()
+        with contextlib.redirect_stdout(s):
+            d.multi_display(3)
+        self.assertEqual(list(d.render_rows(3)), s.getvalue().splitlines())
+        self.assertEqual(list(d.render_rows(3, 3, 10)), ["|ab|", "+--+"])
+
+    def test_impl_without_text_methods(self):
+        d = CountDisplay(PrintOnlyImpl())
+        s = io.StringIO()
+        with contextlib.redirect_stdout(s):
+            d.multi_display(2)
+        self.assertEqual(s.getvalue(), "open\nprint\nprint\nclose\n")
+        with self.assertRaises(TypeError):
+            list(d.render_rows(2))
+
+
+class IndexedFileDisplayImplTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, "text.txt")
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write("one\ntwo\nthree")
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_render_rows_window(self):
+        impl = IndexedFileDisplayImpl(self.path)
+        d = CountDisplay(impl)
+        s = io.StringIO()
+        with contextlib.redirect_stdout(s):
+            d.multi_display(2)
+        lines = s.getvalue().splitlines()
+        self.assertEqual(len(lines), 1 + 2 * 3 + 1)
+        self.assertEqual(list(d.render_rows(2)), lines)
+        for start in range(len(lines) + 1):
+            for stop in range(start, len(lines) + 2):
+                rows = list(d.render_rows(2, start, stop))
+                self.assertEqual(rows, lines[start:stop])
+        self.assertEqual(
+            list(d.render_rows(2, 0, 3)), ["+-----+", "|one  |", "|two  |"]
+        )
+        impl.close()
+
+    def test_foreign_sidecar_is_kept(self):
+        sidecar = self.path + ".idx"
+        with open(sidecar, "w") as f:
+            f.write("not an index")
+        IndexedFileDisplayImpl(self.path).close()
+        with open(sidecar) as f:
+            self.assertEqual(f.read(), "not an index")
+        self.assertEqual(
+            sorted(os.listdir(self.dir.name)), ["text.txt", "text.txt.idx"]
+        )
+
+    def test_own_sidecar_is_replaced(self):
+        IndexedFileDisplayImpl(self.path).close()
+        with open(self.path, "a") as f:
+            f.write("\nfour")
+        impl = IndexedFileDisplayImpl(self.path)
+        self.assertEqual(impl.get_line_count(), 4)
+        impl.close()
+        impl = IndexedFileDisplayImpl(self.path)  # 書き直したキャッシュから読む
+        self.assertEqual(impl.read_lines(3), ["|four |"])
+        impl.close()
+
+
+def sync_output(message: str, times: int) -> bytes:
+    # 同じ表示をStringDisplayImplで出したもの．times < 0ならdisplay
+    s = io.StringIO()
+    with contextlib.redirect_stdout(s):
+        if times < 0:
+            Display(StringDisplayImpl(message)).display()
+        else:
+            CountDisplay(StringDisplayImpl(message)).multi_display(times)
+    return s.getvalue().encode("utf-8")
+
+
+class AsyncServerTest(unittest.IsolatedAsyncioTestCase):
+    # ローカルのTCPサーバで，多数の接続に同時に表示を送る
+    async def handle(self, reader, writer):
+        message, times = (await reader.readline()).decode("utf-8")[:-1].rsplit(" ", 1)
+        impl = AsyncStringDisplayImpl(message, writer)
+        if int(times) < 0:
+            await AsyncDisplay(impl).display()
+        else:
+            await AsyncCountDisplay(impl).multi_display(int(times))
+        writer.close()
+        await writer.wait_closed()
+
+    async def request(self, port: int, message: str, times: int) -> bytes:
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write("{} {}\n".format(message, times).encode("utf-8"))
+        await writer.drain()
+        data = await reader.read()
+        writer.close()
+        await writer.wait_closed()
+        return data
+
+    async def test_many_clients(self):
+        server = await asyncio.start_server(self.handle, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        # 表示1回だけのもの，少ないもの，塊に分かれるほど多いものを混ぜる
+        cases = [("client {}".format(i), (-1, 0, 5, 20000)[i % 4]) for i in range(40)]
+        try:
+            results = await asyncio.gather(
+                *(self.request(port, m, t) for m, t in cases)
+            )
+        finally:
+            server.close()
+            await server.wait_closed()
+        for (message, times), data in zip(cases, results):
+            self.assertEqual(data, sync_output(message, times))
+
+
+if __name__ == "__main__":
+    unittest.main()